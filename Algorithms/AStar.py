@@ -1,17 +1,24 @@
 import os
-from os.path import normpath, abspath, samefile
+from os.path import normpath, abspath
 from pathlib import Path
-import threading
 from datetime import datetime
 import time
 from Utils.FileProcessing import FileProcessing
 from Utils.PathingUtil import reconstruct_path
-from Utils.PathingUtil import file_limit_reached, timer
-from Utils.Metrics import results_in_file
-
-
-class AStar:
-    def __init__(self, current_dir, ending_path, target_file, file_limit=None, run_time_min=0):
+from Utils.Targets import TargetSet
+from Utils.NodeIdentity import NodeRegistry
+from Utils.PruneRules import PruneRules
+from Utils.BloomFilter import visited_set
+from Utils.Milestones import MilestoneRecorder
+from Utils.Heuristics import TreeDistance
+from Utils.Anytime import ProgressReporter, run_search, anytime
+from Utils.SearchEngine import SearchPolicy, make_frontier, best_first_search, relax
+
+
+class AStar(SearchPolicy):
+    def __init__(self, current_dir, ending_path, target_file, file_limit=None, run_time_min=0, target_dirs=None,
+                 heuristic="file_count", follow_symlinks=True, prune_rules=None, node_budget=None,
+                 spill_limit=None, visited_error_rate=None):
         self.file_limit = file_limit
         self.run_time_min = run_time_min
         self.logged_limits = []
@@ -24,18 +31,47 @@ class AStar:
         self.infected_files = 0
         self.infected_nodes = 0
 
-        self.open_set = set()
-        self.closed_set = set()
-        self.g_scores = {}  # Cost from start to node
-        self.f_scores = {}  # Estimated total cost (g + h)
+        self.starting_node = normpath(abspath(current_dir))
+        self.goal_dir = normpath(abspath(ending_path))
+        self.goal_key = None
+        self.result_name = "A_Star"
+
+        # Binary heap keyed by directory, the lowest f score is popped first
+        # spill_limit moves it to disk past that many entries in memory, see SpillFrontier
+        self.frontier = make_frontier(spill_limit)
+        self.closed_set = visited_set(visited_error_rate)  # A Bloom filter when a visited_error_rate is given
+        self.costs = {}  # Cost from start to node, the g score
+        # Most frontier entries kept in memory, None is unbounded. The worst ones are evicted past it
+        self.node_budget = node_budget
+        self.forgotten = {}  # Reopened parent -> lowest priority of its evicted children
         self.parent_map = {}  # To reconstruct path
 
-        # Timer-related attributes
-        self.stop_event = threading.Event()
+        # "file_count" is the original heuristic, "tree" is the exact tree distance to the target path
+        if heuristic not in ("file_count", "tree"):
+            raise ValueError(f"Unknown heuristic {heuristic}. Expected file_count or tree")
+        self.tree_distance = TreeDistance([self.ending_path, *(target_dirs or [])]) if heuristic == "tree" else None
+
         self.start_time = time.perf_counter()
+        self.targets = TargetSet(target_file, target_dirs, self.start_time)
+        self.identity = NodeRegistry(follow_symlinks)
+        self.identity.register(normpath(abspath(current_dir)))
+        self.prune_rules = prune_rules if prune_rules is not None else PruneRules(current_dir)
+        self.file_processing = FileProcessing(self.identity, self.prune_rules)
+        self.milestones = MilestoneRecorder(file_limit, "A_Star", self.start_time,
+                                            lambda node: reconstruct_path(self.parent_map, self.starting_node, node),
+                                            self.logged_limits)
+
+        # Monotonic deadline set when the search starts, unless anytime() set one
+        self.deadline = None
+        self.progress = ProgressReporter([self.ending_path, *(target_dirs or [])])
+        # Periodic checkpoint of the search state, set by attach_checkpoint
+        self.checkpoint = None
 
     def heuristic(self, current_dir, goal_dir):
-        """Heuristic based solely on the difference in file counts"""
+        """Heuristic based solely on the difference in file counts, or the tree distance when enabled"""
+        if self.tree_distance is not None:
+            return self.tree_distance(current_dir)
+
         try:
             current_count = FileProcessing().count_files_in_directory(current_dir)
             goal_count = FileProcessing().count_files_in_directory(goal_dir)
@@ -43,10 +79,16 @@ class AStar:
         except:
             return float('inf')  # If inaccessible, treat as worst case
 
+    def step_cost(self, value):
+        """Every move costs at least 1 with the tree distance so it stays admissible and consistent"""
+        if self.tree_distance is not None:
+            return value + 1
+        return value
+
     def get_neighbors(self, node):
         """Get all accessible directories with file counts and status"""
         try:
-            neighbors = FileProcessing().get_all_directories_with_file_counts(node)
+            neighbors = self.file_processing.get_all_directories_with_file_counts(node)
             for neighbor in neighbors:
                 neighbor["dir_name"] = normpath(abspath(neighbor["dir_name"]))
             return neighbors
@@ -57,156 +99,65 @@ class AStar:
             print(f"Error getting neighbors for {node}: {str(e)}")
             return []
 
-    def process_neighbor(self, current, neighbor, goal):
-        """Process a single neighbor node"""
-        dir_name = neighbor["dir_name"]
-        value = neighbor["value"]
-
-        tentative_g_score = self.g_scores[current] + value
-
-        if dir_name not in self.g_scores or tentative_g_score < self.g_scores[dir_name]:
-            self.parent_map[dir_name] = current
-            self.g_scores[dir_name] = tentative_g_score
-            self.f_scores[dir_name] = tentative_g_score + self.heuristic(dir_name, goal)
-
-            if dir_name not in self.open_set and dir_name not in self.closed_set:
-                self.open_set.add(dir_name)
-
-        try:
-            for file in os.listdir(dir_name):
-                file_path = os.path.join(dir_name, file)
-                if os.path.isfile(file_path):
-                    self.infected_files += 1
-        except (PermissionError, FileNotFoundError):
-            pass
-
     def a_star(self):
-        """Optimized A* search algorithm with built-in timer"""
-        current_dir = normpath(abspath(self.current_dir))
-        goal_dir = normpath(abspath(self.ending_path))
-
-        # Initialize data structures
-        self.parent_map = {current_dir: None}
-        self.g_scores[current_dir] = 0
-        self.f_scores[current_dir] = self.heuristic(current_dir, goal_dir)
-        self.open_set.add(current_dir)
-
-        # Start timer thread if time limit is set
-        timer_thread = None
-        if self.run_time_min > 0:
-            timer_thread = threading.Thread(target=timer, args=(self.start_time, self.run_time_min, self.stop_event))
-            timer_thread.daemon = True
-            timer_thread.start()
-
-        if self.stop_event.is_set():
-                print("Time limit reached. Stopping the process.")
-                path = reconstruct_path(self.parent_map, current_dir, current_dir)
-                print(f"Path: {path}")
-                results_in_file(
-                    path,
-                    self.target_found,
-                    time.perf_counter() - self.start_time,
-                    self.infected_nodes,
-                    self.infected_files,
-                    "A_Star",
-                    self.file_limit
-                )
-                return [
-                    path,
-                    self.target_found,
-                    time.perf_counter() - self.start_time,
-                    self.infected_nodes,
-                    self.infected_files
-                ]
-
-        try:
-            while self.open_set and not self.stop_event.is_set():
-                current = min(self.open_set, key=lambda x: self.f_scores.get(x, float('inf')))
-                self.open_set.remove(current)
-
-                # Check file limit condition
-                if self.file_limit:
-                    for limit in self.file_limit:
-                        if limit not in self.logged_limits and file_limit_reached(self.infected_files, limit):
-                            self.logged_limits.append(limit)
-                            path = reconstruct_path(self.parent_map, current_dir, current)
-
-                            results_in_file(
-                                path,
-                                self.target_found,
-                                time.perf_counter() - self.start_time,
-                                self.infected_nodes,
-                                self.infected_files,
-                                "A_Star",
-                                limit
-                            )
-                            break
-
-
-                # Check target conditions
-                try:
-                    if samefile(current, goal_dir):
-                        print(f"Reached target directory: {goal_dir}")
-                        path = reconstruct_path(self.parent_map, current_dir, current)
-                        self.target_found = True
-
-                        results_in_file(
-                            path,
-                            self.target_found,
-                            time.perf_counter() - self.start_time,
-                            self.infected_nodes,
-                            self.infected_files,
-                            "A_Star",
-                            self.file_limit
-                        )
-
-                        return path if path else [], self.infected_files, self.infected_nodes
-
-                    if os.path.isdir(current) and self.target_file in os.listdir(current):
-                        print(f"Found {self.target_file} in {current}!")
-                        self.target_found = True
-                        path = reconstruct_path(self.parent_map, current_dir, current)
-
-                        results_in_file(
-                            path,
-                            self.target_found,
-                            time.perf_counter() - self.start_time,
-                            self.infected_nodes,
-                            self.infected_files,
-                            "A_Star",
-                            self.file_limit
-                        )
-
-                        return path if path else [], self.infected_files, self.infected_nodes
-                except (PermissionError, FileNotFoundError) as e:
-                    print(f"Error checking directory {current}: {str(e)}")
-                    continue
-
-                self.closed_set.add(current)
-                self.infected_nodes += 1
-
-                # Process neighbors
-                neighbors = self.get_neighbors(current)
-                for neighbor in neighbors:
-                    self.process_neighbor(current, neighbor, goal_dir)
-
-                # Add parent directory as fallback
-                parent_dir = normpath(abspath(os.path.dirname(current)))
-                if parent_dir != current and parent_dir not in self.closed_set:
-                    if parent_dir not in self.g_scores:
-                        self.g_scores[parent_dir] = float('inf')
-
-                    neighbor_data = {
-                        "dir_name": parent_dir,
-                        "value": 1,
-                        "status": "normal"
-                    }
-                    self.process_neighbor(current, neighbor_data, goal_dir)
-            path = reconstruct_path(self.parent_map, current_dir, current)
-            return [path if path else [], self.infected_files, self.infected_nodes]
-        finally:
-            # Clean up timer thread
-            if timer_thread and timer_thread.is_alive():
-                self.stop_event.set()
-                timer_thread.join()
-
+        """
+        Optimized A* search algorithm
+        Returns:
+        - Path
+        - Target Found
+        - Elapsed Time
+        - Infected Nodes
+        - Infected Files
+        """
+        return run_search(self.steps())
+
+    def anytime(self, interval=0.1, deadline=None):
+        """Yield a Progress every interval seconds until the search ends or the deadline in seconds passes"""
+        return anytime(self, interval, deadline)
+
+    def steps(self):
+        """The search as a generator, it yields a Progress when one is due and returns the result"""
+        return best_first_search(self)
+
+    # Policy of the search engine
+    def start(self, node):
+        # Identity of the goal is computed once instead of two stat calls on every pop
+        self.goal_key = self.identity.key_of(self.goal_dir)
+        self.parent_map = {node: None}
+        return 0, self.heuristic(node, self.goal_dir)
+
+    def reached_goal(self, node):
+        """Reaching the goal directory only ends a single target search"""
+        if not self.targets.multi and self.identity.is_same(node, self.goal_key):
+            print(f"Reached target directory: {self.goal_dir}")
+            return True
+        return False
+
+    def visit(self, node):
+        # A spilled frontier can hold a directory twice, the second entry is skipped once it is closed
+        return node not in self.closed_set
+
+    def close(self, node):
+        self.closed_set.add(node)
+        self.count_node()
+
+    def expand(self, node, found_targets):
+        return self.get_neighbors(node)
+
+    def cost(self, node, entry):
+        return self.costs[node] + self.step_cost(entry["value"])
+
+    def priority(self, child, cost):
+        if child in self.closed_set:
+            return None
+        return cost + self.heuristic(child, self.goal_dir)
+
+    def may_climb(self, node, parent):
+        return parent not in self.closed_set
+
+    def climb(self, node, parent):
+        """The parent directory is relaxed like a child with a cost of 1"""
+        relax(self, node, {"dir_name": parent, "value": 1, "status": "normal"})
+
+    def reopen(self, node):
+        self.closed_set.discard(node)
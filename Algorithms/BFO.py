@@ -1,19 +1,33 @@
 from hmac import new
 import random
 import os
-from os.path import normpath, join, isfile, dirname
+from os.path import normpath, abspath, join, isfile, dirname
 import time
-import threading
 import datetime
+from bisect import bisect_left
+from itertools import accumulate
+from concurrent.futures import ThreadPoolExecutor
 
 from Utils.FileProcessing import FileProcessing
-from Utils.PathingUtil import file_limit_reached, reconstruct_path, timer
+from Utils.PathingUtil import reconstruct_path
 from Utils.Metrics import results_in_file
+from Utils.Targets import TargetSet
+from Utils.NodeIdentity import NodeRegistry
+from Utils.PruneRules import PruneRules
+from Utils.BloomFilter import visited_set, estimated_error
+from Utils.Infection import infect_directory
+from Utils.Milestones import MilestoneRecorder
+from Utils.Population import Population, PositionIndex
+from Utils.Nutrients import NutrientEngine
+from Utils.Anytime import Deadline, ProgressReporter, search_result, run_search, anytime
 
+# chemotaxis_step senses the position itself, sense() returning None means it could not be read
+_NOT_SENSED = object()
 
 
 class BacterialForaging:
-    def __init__(self, start_dir, target_path, target_file, file_limit=None, run_time_min=0):
+    def __init__(self, start_dir, target_path, target_file, file_limit=None, run_time_min=0, target_dirs=None, follow_symlinks=True, prune_rules=None, visited_error_rate=None, population=10, workers=None,
+                 audit_files=False):
         self.start_dir = start_dir
         self.file_limit = file_limit
         self.logged_limits = []
@@ -22,113 +36,150 @@ class BacterialForaging:
         self.target_file = target_file
         self.infected_files = 0
         self.infected_nodes = 0
-        self.bacteria = []
-        self.nutrients = {}
+        self.population_size = population
+        self.workers = workers  # Threads sensing the bacteria of a step, None lets the pool decide
+        self.bacteria = None  # Population, set by initialize_bacteria
+        self.nutrients = NutrientEngine(self.target_path)
         self.blocked = set()
         self.found_path = None
         self.parent_map = {}  # For path reconstruction
+        self.accessible = PositionIndex()  # Reached directories the dispersal can send a bacterium to
         self.best_path = []
-        self.visited_nodes = set()  # Track visited directories
-        self.infected_file_set = set()  # Track infected files
+        # Exact sets, or Bloom filters when a visited_error_rate is given
+        self.visited_nodes = visited_set(visited_error_rate)  # Track visited directories
+        self.infected_file_set = visited_set(visited_error_rate) if audit_files else None  # Every file, for audits
         self.search_depth = 0
         self.max_search_depth = 100  # Limit how deep the search goes
 
-        # Timer-related attributes
-        self.stop_event = threading.Event()
-        self.start_time = time.perf_counter()
+        self.target_found = False
+        self.result_name = "Bacterial_Foraging_Optimization"
 
-    def initialize_bacteria(self, start_dir, num_bacteria=10):
+        self.start_time = time.perf_counter()
+        self.targets = TargetSet(target_file, target_dirs, self.start_time)
+        self.identity = NodeRegistry(follow_symlinks)
+        self.identity.register(normpath(abspath(start_dir)))
+        self.prune_rules = prune_rules if prune_rules is not None else PruneRules(start_dir)
+        self.file_processing = FileProcessing(self.identity, self.prune_rules)
+        self.milestones = MilestoneRecorder(file_limit, self.result_name, self.start_time,
+                                            lambda node: reconstruct_path(self.parent_map, self.start_dir, node),
+                                            self.logged_limits)
+
+        # Monotonic deadline set when the search starts, unless anytime() set one
+        self.deadline = None
+        self.progress = ProgressReporter([self.target_path, *(target_dirs or [])])
+
+    def initialize_bacteria(self, start_dir, num_bacteria=None):
         """Initialize bacteria population at starting directory"""
         start_dir = normpath(start_dir)
         print(f"Initializing bacteria at: {start_dir}")
-        print(f"Target file: {join(self.target_path, self.target_file)}")
+        print(f"Target files: {self.targets.target_files} near {self.target_path}")
 
         self.parent_map[start_dir] = None
         self.visited_nodes.add(start_dir)
         self.infected_nodes += 1
 
-        for _ in range(num_bacteria):
-            self.bacteria.append({
-                'position': start_dir,
-                'health': 100,
-                'path': [start_dir],
-                'depth': 0
-            })
+        self.bacteria = Population(num_bacteria or self.population_size, start_dir)
+        self.accessible.add(start_dir, int(self.bacteria.tip[0]), 0)
+
+    def evaluate_nutrients(self, paths, mtimes=None):
+        """Fitness of every directory in one call, -100 for the blocked ones and the ones that cannot be read"""
+        candidates = [path for path in paths if path not in self.blocked]
+        scores = dict(zip(candidates, self.nutrients.score(candidates, mtimes)))
+
+        fitness = []
+        for path in paths:
+            nutrient = scores.get(path)
+            if nutrient is None:
+                self.blocked.add(path)
+                nutrient = -100
+            fitness.append(nutrient)
+        return fitness
 
     def evaluate_nutrient(self, path):
         """Calculate fitness of a directory"""
-        path = normpath(path)
-        if path in self.blocked:
-            return -100
-
+        return self.evaluate_nutrients([normpath(path)])[0]
+
+    def sense(self, current):
+        """
+        The I/O of a chemotaxis step from current, safe to run in a thread as it changes nothing of the search:
+        the entries of current for the target check, the keys of its subdirectories and every neighbor with its
+        nutrient, None for the ones that cannot be read. None when current cannot be listed.
+        Blocked and duplicate neighbors are filtered when the step is applied, in bacterium order.
+        """
+        mtimes = {}  # Filled from the scandir entries, the nutrients need no stat of their own
+        keys = {}  # Subdirectory -> key, registered when the step is applied
+        entries = []  # Names of the files of current, from the same scandir pass
         try:
-            if path in self.nutrients:
-                return self.nutrients[path]
-
-            path_similarity = 0
-            target_parts = self.target_path.split(os.sep)
-            current_parts = path.split(os.sep)
-
-            common_depth = 0
-            for t, c in zip(target_parts, current_parts):
-                if t == c:
-                    common_depth += 1
-                else:
-                    break
-
-            path_similarity = common_depth / len(target_parts) * 0.5
-            file_count = FileProcessing.count_files_in_directory(path)
-            recency = os.path.getmtime(path) if os.path.exists(path) else 0
-
-            nutrient = (file_count * 0.4) + (recency * 0.1) + (path_similarity * 0.5)
-            self.nutrients[path] = nutrient
-            return nutrient
-        except:
-            self.blocked.add(path)
-            return -100
-
-    def chemotaxis_step(self, bacterium):
-        """Move bacterium toward nutrients"""
-        current = normpath(bacterium['position'])
+            neighbors = FileProcessing.list_subdirectories(current, self.identity, self.prune_rules, mtimes, keys,
+                                                           files=entries)
+        except OSError:
+            return None
+
+        parent = normpath(dirname(current))
+        if parent != current:
+            neighbors.append(parent)
+        return entries, keys, list(zip(neighbors, self.nutrients.score(neighbors, mtimes)))
+
+    def admit_neighbor(self, path, keys):
+        """Whether a sensed neighbor may be moved to, a listed one is registered with the key it was sensed with"""
+        if path in keys:
+            return self.identity.register(path, key=keys[path])
+        return self.file_processing.admit(path)
+
+    def sense_all(self, pool):
+        """Sense every distinct position of the population at once through the pool, position -> sensed"""
+        bacteria = self.bacteria
+        positions = {bacteria.nodes[node] for node, depth in zip(bacteria.position, bacteria.depth)
+                     if depth < self.max_search_depth}
+        return dict(zip(positions, pool.map(self.sense, positions)))
+
+    def chemotaxis_step(self, i, sensed=_NOT_SENSED):
+        """Move bacterium i toward nutrients, sensed is what sense() returned for its position"""
+        bacteria = self.bacteria
+        current = bacteria.position_of(i)
+
+        if bacteria.depth[i] >= self.max_search_depth:
+            bacteria.health[i] -= 10
+            return False
 
-        if bacterium['depth'] >= self.max_search_depth:
-            bacterium['health'] -= 10
+        if sensed is _NOT_SENSED:
+            sensed = self.sense(current)
+        if sensed is None:
+            print(f"Cannot read {current}; Blocking it...")
+            self.blocked.add(current)
             return False
 
-        if FileProcessing.is_target_in_directory(current, self.target_file):
+        entries, keys, neighbors = sensed
+        if self.targets.check(current, entries, path_resolver=lambda: bacteria.path(i)):
             print(f"Found target at: {current}")
             self.found_path = current
-            self.best_path = bacterium['path'].copy()
-            results_in_file(
-                self.best_path,
-                self.found_path,
-                time.perf_counter() - self.start_time,
-                self.infected_nodes,
-                self.infected_files,
-                "Bacterial_Foraging_Optimization",
-                self.file_limit
-            )
-
-            return True
+            self.target_found = True
+            self.best_path = bacteria.path(i)
 
-        neighbors = []
-        try:
-            for entry in os.listdir(current):
-                full_path = join(current, entry)
-                if os.path.isdir(full_path):
-                    neighbors.append(full_path)
+            if self.targets.done:
+                self.milestones.flush()
+                results_in_file(
+                    self.best_path,
+                    self.target_found,
+                    time.perf_counter() - self.start_time,
+                    self.infected_nodes,
+                    self.infected_files,
+                    self.result_name,
+                    self.file_limit,
+                    error_rate=estimated_error(self)
+                )
 
-            parent = normpath(dirname(current))
-            if parent != current:
-                neighbors.append(parent)
-        except:
-            pass
+                return True
 
+        # Bacteria earlier in the step may have blocked some since they were sensed
         graded = []
-        for path in neighbors:
-            path = normpath(path)
-            if path not in self.blocked:
-                fitness = self.evaluate_nutrient(path)
+        for path, fitness in neighbors:
+            if path in self.blocked:
+                continue
+            if fitness is None:
+                self.blocked.add(path)
+                continue
+            if self.admit_neighbor(path, keys):
                 graded.append((path, fitness))
 
         if not graded:
@@ -139,64 +190,35 @@ class BacterialForaging:
             random.shuffle(graded)
             chosen_path = graded[0][0]
         else:
-            total = sum(f for _, f in graded)
+            cumulative = list(accumulate(fitness for _, fitness in graded))
+            total = cumulative[-1]
             if total <= 0:
                 return False
 
+            # Roulette, the first neighbor whose cumulative fitness reaches the draw
             rand_val = random.uniform(0, total)
-            cumulative = 0
-            for path, fitness in graded:
-                cumulative += fitness
-                if rand_val <= cumulative:
-                    chosen_path = path
-                    break
-
-        bacterium['position'] = chosen_path
-        bacterium['path'].append(chosen_path)
-        bacterium['depth'] += 1
-        self.parent_map[chosen_path] = current
+            chosen_path = graded[min(bisect_left(cumulative, rand_val), len(graded) - 1)][0]
 
         if chosen_path not in self.visited_nodes:
-            self.visited_nodes.add(chosen_path)
-            self.infected_nodes += 1
-
             try:
-                for f in os.listdir(chosen_path):
-                    file_path = join(chosen_path, f)
-                    if isfile(file_path) and file_path not in self.infected_file_set:
-                        self.infected_file_set.add(file_path)
-                        self.infected_files += 1
-            except:
+                # A visited directory has its files infected, infect_directory marks it
+                infected = infect_directory(chosen_path, self.visited_nodes, self.infected_file_set)
+            except OSError:
+                # The bacterium stays where it is
+                self.visited_nodes.add(chosen_path)
                 self.blocked.add(chosen_path)
                 return False
+            self.infected_nodes += 1
+            self.infected_files += infected
 
+        bacteria.move(i, chosen_path)
+        self.parent_map[chosen_path] = current
+        self.accessible.add(chosen_path, int(bacteria.tip[i]), int(bacteria.depth[i]))
         return False
 
     def reproduction(self):
-        """Reproduce healthiest bacteria"""
-        self.bacteria.sort(key=lambda x: x['health'], reverse=True)
-        top_half = self.bacteria[:max(1, len(self.bacteria) // 2)]
-        new_population = []
-
-        for b in top_half:
-            # Create two clones with slight variations
-            clone1 = {
-                'position': b['position'],
-                'health': 100,
-                'path': list(b['path']),
-                'depth': b['depth']
-            }
-
-            clone2 = {
-                'position': self.get_random_neighbor(b['position']),
-                'health': 100,
-                'path': list(b['path']),
-                'depth': b['depth']
-            }
-
-            new_population.extend([clone1, clone2])
-
-        self.bacteria = new_population
+        """Reproduce healthiest bacteria, each one into a clone in place and a clone on a random neighbor"""
+        self.bacteria.reproduce(self.get_random_neighbor)
 
     def get_random_neighbor(self, position):
         """Get a random accessible neighbor"""
@@ -204,14 +226,13 @@ class BacterialForaging:
         neighbors = []
         try:
             # Add child directories
-            for entry in os.listdir(position):
-                full_path = join(position, entry)
-                if os.path.isdir(full_path) and full_path not in self.blocked:
+            for full_path in self.file_processing.subdirectories(position):
+                if full_path not in self.blocked:
                     neighbors.append(full_path)
 
             # Add parent directory if not root
             parent = normpath(dirname(position))
-            if parent != position and parent not in self.blocked:
+            if parent != position and parent not in self.blocked and self.file_processing.admit(parent):
                 neighbors.append(parent)
         except:
             pass
@@ -219,103 +240,88 @@ class BacterialForaging:
         return random.choice(neighbors) if neighbors else position
 
     def elimination_dispersal(self, p_elim=0.1, start_dir=None):
-        """Randomly relocate some bacteria"""
-        for i, bacterium in enumerate(self.bacteria):
-            if random.random() < p_elim:
-                if start_dir:
-                    self.bacteria[i]['position'] = normpath(start_dir)
-                    self.bacteria[i]['path'] = [normpath(start_dir)]
-                    self.bacteria[i]['depth'] = 0
-                else:
-                    # Randomly select from known accessible paths
-                    accessible = [p for p in self.parent_map.keys() if p not in self.blocked]
-                    if accessible:
-                        new_pos = random.choice(accessible)
-                        self.bacteria[i]['position'] = new_pos
-                        self.bacteria[i]['path'] = reconstruct_path(self.parent_map,new_pos, new_pos)
-                        self.bacteria[i]['depth'] = len(self.bacteria[i]['path']) - 1
-                self.bacteria[i]['health'] = 100
+        """Randomly relocate some bacteria, all of them are drawn first and moved in one batch"""
+        eliminated = [i for i in range(len(self.bacteria)) if random.random() < p_elim]
+        start_dir = normpath(start_dir) if start_dir else None
+
+        for i in eliminated:
+            # The start directory, or a random known accessible one, with the trail that first reached it
+            new_pos = start_dir if start_dir else self.accessible.sample(random, self.blocked)
+            if new_pos in self.accessible:
+                self.bacteria.settle(i, *self.accessible.trails[new_pos])
+            elif new_pos:
+                self.bacteria.place(i, [new_pos])
+            self.bacteria.health[i] = 100
+
     def run(self):
-        """Main BFO algorithm with integrated timer"""
+        """
+        Main BFO algorithm
+        Returns:
+        - Path
+        - Target Found
+        - Elapsed Time
+        - Infected Nodes
+        - Infected Files
+        """
+        return run_search(self.steps())
+
+    def anytime(self, interval=0.1, deadline=None):
+        """Yield a Progress every interval seconds until the search ends or the deadline in seconds passes"""
+        return anytime(self, interval, deadline)
+
+    def steps(self):
+        """The search as a generator, it yields a Progress when one is due and returns the result"""
+        if self.deadline is None:
+            self.deadline = Deadline(self.start_time, self.run_time_min * 60)
+
         self.initialize_bacteria(self.start_dir)
         found = False
         steps = 0
-
-        # Start timer thread if time limit is set
-        timer_thread = None
-        if self.run_time_min > 0:
-            timer_thread = threading.Thread(target=timer,  args=(self.start_time, self.run_time_min, self.stop_event))
-            timer_thread.daemon = True
-            timer_thread.start()
+        pool = ThreadPoolExecutor(self.workers)
 
         try:
-            if self.stop_event.is_set():
-                print("BFO algorithm stopping due to timeout")
-                try:
-                    path = reconstruct_path(self.parent_map, self.start_dir, self.target_path)
-                except ValueError:
-                    path = "Path not found"
-
-                results_in_file(
-                    path,
-                    found,
-                    time.perf_counter() - self.start_time,
-                    self.infected_nodes,
-                    self.infected_files,
-                    "Bacterial_Foraging_Optimization",
-                    self.file_limit
-                    )
-                return [
-                    path,
-                    found,
-                    time.perf_counter() - self.start_time,
-                    self.infected_nodes,
-                    self.infected_files
-                ]
+            while not found:
+                if self.deadline.expired():
+                    print("BFO algorithm stopping due to timeout")
+                    self.milestones.flush()
+                    results_in_file(
+                        self.best_path or "Path not found",
+                        self.target_found,
+                        time.perf_counter() - self.start_time,
+                        self.infected_nodes,
+                        self.infected_files,
+                        self.result_name,
+                        self.file_limit,
+                        error_rate=estimated_error(self)
+                        )
+                    return search_result(self.best_path, self.target_found, self.start_time,
+                                         self.infected_nodes, self.infected_files)
 
-            while not found and not self.stop_event.is_set():
                 steps += 1
 
-                if self.file_limit:
-                    for limit in self.file_limit:
-                        print(f"Infected files: {self.infected_files}"
-                              f"\nCurrent File limit: {limit}"
-                              f"\nCurrent Logged Limits: {self.logged_limits}")
-                        # input("press Enter to continue...")
-                        if limit not in self.logged_limits and file_limit_reached(self.infected_files, limit):
-                            self.logged_limits.append(limit)
-                            path = reconstruct_path(self.parent_map, self.start_dir, self.target_path)
-
-                            results_in_file(
-                                path,
-                                found,
-                                time.perf_counter() - self.start_time,
-                                self.infected_nodes,
-                                self.infected_files,
-                                "Bacterial_Foraging_Optimization",
-                                limit
-                            )
-                            break
-
-                # Chemotaxis phase
-                for bacterium in self.bacteria:
-                    if self.chemotaxis_step(bacterium):
+                # Resolves to "Path not found" until the target path is reached
+                self.milestones.check(self.infected_files, self.infected_nodes, self.target_path, found)
+                if self.progress.due(self.bacteria.position_of(0)):
+                    yield self.progress.snapshot(self, lambda node: reconstruct_path(self.parent_map, self.start_dir, node),
+                                                 len(self.bacteria))
+
+                # Chemotaxis phase, the listings and nutrients of all bacteria are read concurrently,
+                # then every step is applied in bacterium order so the random choices stay reproducible
+                sensed = self.sense_all(pool)
+                for i in range(len(self.bacteria)):
+                    if self.chemotaxis_step(i, sensed.get(self.bacteria.position_of(i), _NOT_SENSED)):
                         found = True
                         break
+                    if self.deadline.expired():
+                        break
 
-                if found or self.stop_event.is_set():
-                    break
-
-                # Update health
-                for bacterium in self.bacteria:
-                    current_nut = self.evaluate_nutrient(bacterium['position'])
-                    if current_nut > 0:
-                        bacterium['health'] = min(100, bacterium['health'] + current_nut * 0.1)
-                    else:
-                        bacterium['health'] -= 5
+                if found or self.deadline.expired():
+                    continue
 
-                    if bacterium['health'] <= 0:
-                        self.elimination_dispersal(p_elim=1.0, start_dir=self.start_dir)
+                # Update health, a death sends the whole population back to the start
+                nutrients = self.evaluate_nutrients([self.bacteria.nodes[node] for node in self.bacteria.position])
+                if self.bacteria.feed(nutrients):
+                    self.elimination_dispersal(p_elim=1.0, start_dir=self.start_dir)
 
                 # Reproduction phase
                 if steps % 10 == 0:
@@ -326,32 +332,11 @@ class BacterialForaging:
                     self.elimination_dispersal(start_dir=self.start_dir)
 
         finally:
-            # Clean up timer thread
-            if timer_thread and timer_thread.is_alive():
-                self.stop_event.set()
-                timer_thread.join()
-
-        # Return results
-        if self.best_path:
-            path_display = os.path.sep.join(self.best_path)
-            path = reconstruct_path(self.parent_map, self.start_dir, self.target_path)
-
-            results_in_file(
-                path,
-                found,
-                time.perf_counter() - self.start_time,
-                self.infected_nodes,
-                self.infected_files,
-                "Bacterial_Foraging_Optimization",
-                self.file_limit
-            )
-
-        else:
-            path_display = f"Searching... (Depth: {self.search_depth})"
-
-        return [path_display, self.infected_files, self.infected_nodes]
-
+            pool.shutdown(wait=False)
+            self.milestones.flush()
 
+        # The walked path of the bacterium that found the last target, its results were written by chemotaxis_step
+        return search_result(self.best_path, self.target_found, self.start_time, self.infected_nodes, self.infected_files)
 
     def update_metrics(self, start_time):
         """Update global metrics with current state"""
@@ -1,16 +1,46 @@
 import os
-from os.path import normpath
-from pathlib import Path
+from os.path import normpath, abspath
 import datetime
 import time
-import threading
 from Utils.FileProcessing import FileProcessing
-from Utils.PathingUtil import file_limit_reached, timer
+from Utils.PathingUtil import reconstruct_path
 from Utils.Metrics import results_in_file
+from Utils.Targets import TargetSet
+from Utils.NodeIdentity import NodeRegistry
+from Utils.PruneRules import PruneRules
+from Utils.BloomFilter import visited_set, estimated_error
+from Utils.Infection import infect_directory
+from Utils.Milestones import MilestoneRecorder
+from Utils.Anytime import Deadline, ProgressReporter, search_result, run_search, anytime
+from Utils.SearchEngine import Frontier
+
+
+def path_parts(path):
+    """Components of a directory path, the root is a single empty component."""
+    return tuple(normpath(path).rstrip(os.sep).split(os.sep))
+
+
+def shared_depth(parts1, parts2, known=0):
+    """Number of leading components two paths share, the first known ones are already known to match."""
+    depth = known
+    limit = min(len(parts1), len(parts2))
+    while depth < limit and parts1[depth] == parts2[depth]:
+        depth += 1
+    return depth
+
+
+def directly_connected(parts1, parts2, shared):
+    """One path is an ancestor of the other, or their deepest common parent is within 2 levels of the shallower."""
+    shallower = min(len(parts1), len(parts2))
+    if shared == shallower:
+        return True
+    common_parent = min(shared, len(parts1) - 1, len(parts2) - 1)
+    return common_parent > 0 and common_parent >= shallower - 2
 
 
 class EBSAStar:
-    def __init__(self, current_dir, ending_path, target_file, file_limit=None, run_time_min=0):
+    def __init__(self, current_dir, ending_path, target_file, file_limit=None, run_time_min=0, target_dirs=None, follow_symlinks=True, prune_rules=None, visited_error_rate=None,
+                 smooth_paths=False, audit_files=False):
         print(f"Initializing EBSAStar with: current_dir={current_dir}, ending_path={ending_path}, target_file={target_file}, file_limit={file_limit}, run_time_min={run_time_min}")
         self.current_dir = current_dir
         self.file_limit = file_limit
@@ -18,16 +48,37 @@ class EBSAStar:
         self.run_time_min = run_time_min
         self.ending_path = normpath(ending_path)
         self.target_found = False
+        self.result_name = "Enhanced_BiDirectional_A_Search"
         self.infected_nodes = 0
         self.infected_files = 0
-        self.processed_files = set()
+        # Exact sets, or Bloom filters when a visited_error_rate is given. File paths are only kept for audits
+        self.infected_directories = visited_set(visited_error_rate)
+        self.processed_files = visited_set(visited_error_rate) if audit_files else None
         self.target_file = target_file
         self.forward_parents = {}
         self.backward_parents = {}
         self.intersection_node = None
+        self.forward_g = {}
+        self.backward_g = {}
+        self.goal_count = 0
+        # Directory of the last target found, the reported path leads there when the searches never met
+        self.found_node = None
+        # Report smoothed paths, see smoothing
+        self.smooth_paths = smooth_paths
 
-        self.stop_event = threading.Event()
         self.start_time = time.perf_counter()
+        self.targets = TargetSet(target_file, target_dirs, self.start_time)
+        self.identity = NodeRegistry(follow_symlinks)
+        self.identity.register(normpath(abspath(current_dir)))
+        self.prune_rules = prune_rules if prune_rules is not None else PruneRules(current_dir)
+        self.file_processing = FileProcessing(self.identity, self.prune_rules)
+        self.milestones = MilestoneRecorder(file_limit, self.result_name, self.start_time,
+                                            self.report_path,
+                                            self.logged_limits)
+
+        # Monotonic deadline set when the search starts, unless anytime() set one
+        self.deadline = None
+        self.progress = ProgressReporter([self.ending_path, *(target_dirs or [])])
         print("EBSAStar initialization complete")
 
     def _infect_directory(self, dir_path, close_list):
@@ -44,31 +95,32 @@ class EBSAStar:
             self.infected_nodes += 1
             print(f"Added {dir_path} to close list. Total infected nodes: {self.infected_nodes}")
 
-            for f in os.listdir(dir_path):
-                file_path = os.path.join(dir_path, f)
-                if os.path.isfile(file_path) and file_path not in self.processed_files:
-                    self.processed_files.add(file_path)
-                    self.infected_files += 1
-                    print(f"Processed file {file_path}. Total files: {self.infected_files}")
-                    
-                    if self.file_limit:
-                        for limit in self.file_limit:
-                            if limit not in self.logged_limits and file_limit_reached(self.infected_files, limit):
-                                print(f"File limit {limit} reached at {self.infected_files} files")
-                                results_in_file(
-                                    None,
-                                    self.target_found,
-                                    time.perf_counter() - self.start_time,
-                                    self.infected_nodes,
-                                    self.infected_files,
-                                    "Enhanced_BiDirectional_A_Search",
-                                    limit
-                                )
-                                self.logged_limits.append(limit)
+            self.check_targets(dir_path)
+
+            infected = infect_directory(dir_path, self.infected_directories, self.processed_files)
+            if infected:
+                self.infected_files += infected
+                print(f"Processed {infected} files in {dir_path}. Total files: {self.infected_files}")
+
+            self.milestones.check(self.infected_files, self.infected_nodes, self.intersection_node, self.target_found)
 
         except Exception as e:
             print(f"ERROR in _infect_directory for {dir_path}: {str(e)}")
 
+    def check_targets(self, dir_path, path_resolver=None):
+        """Mark the targets in dir_path as found, the search only reports found once one of them is"""
+        try:
+            found_targets = self.targets.check(dir_path, self.file_processing.scan(dir_path),
+                                               path_resolver or (lambda: self.report_path(dir_path)))
+        except (PermissionError, FileNotFoundError):
+            print(f"ACCESS DENIED to {dir_path}. Skipping this directory.")
+            return []
+        if found_targets:
+            print(f"Found {', '.join(found_targets)} in {dir_path}")
+            self.target_found = True
+            self.found_node = dir_path
+        return found_targets
+
     def heuristic(self, current_count, target_count):
         """Improved heuristic considering both file count difference and depth"""
         h = abs(current_count - target_count)
@@ -79,7 +131,7 @@ class EBSAStar:
         """Get all accessible directories with file counts and status"""
         try:
             print(f"Getting neighbors for node: {node}")
-            neighbors = FileProcessing().get_all_directories_with_file_counts(node)
+            neighbors = self.file_processing.get_all_directories_with_file_counts(node)
             for neighbor in neighbors:
                 neighbor["dir_name"] = normpath(neighbor["dir_name"])
             print(f"Found {len(neighbors)} neighbors for {node}")
@@ -91,213 +143,211 @@ class EBSAStar:
             print(f"ERROR getting neighbors for {node}: {str(e)}")
             return []
 
-    def search(self, node, open_list, close_list, goal, is_forward_search, parents):
-        """Enhanced search with parent and grandparent directory fallback"""
-        print(f"Searching from node: {node} (forward={is_forward_search})")
+    def meet(self, node):
+        """
+        Both searches reached node, True when the joined path ends the search.
+        The targets are checked in the meeting and the ending directory, reaching the ending path alone finds nothing.
+        """
+        path = self._reconstruct_path(self.forward_parents, self.backward_parents, node)
+        print(f"INTERSECTION FOUND at {node}")
+        if not self.validate_path(path):
+            return False
+        self.intersection_node = node
+        print(f"VALID PATH FOUND: {path}")
+        self.check_targets(node)
+        if node != self.ending_path:
+            self.check_targets(self.ending_path, lambda: self.report_path(node))
+        self.milestones.check(self.infected_files, self.infected_nodes, node, self.target_found)
+        # With several targets keep expanding until all of them are found
+        return not self.targets.multi or self.targets.done
+
+    def push_forward(self, open_list, close_list, node, child, child_count):
+        """Reach child from node with the accumulated g of node, True when it meets the backward search"""
+        if child in close_list or child in open_list:
+            return False
+        g = self.forward_g[node] + 1
+        h = self.heuristic(child_count, self.goal_count)
+        print(f"Adding to open list: {child}, g={g}, h={h}, f={g + h}")
+        open_list.push(child, g + h)
+        self.forward_g[child] = g
+        self.forward_parents[child] = node
+        return child in self.backward_parents and self.meet(child)
+
+    def search(self, node, open_list, close_list):
+        """
+        Forward expansion with parent and grandparent directory fallback.
+        True when a reached directory meets the backward search and ends it.
+        """
+        print(f"Searching forward from node: {node}")
         neighbors = self.get_neighbors(node)
 
         # Enhanced parent/grandparent directory fallback
         if not neighbors:
             print(f"No neighbors found for {node}, attempting parent/grandparent fallback")
             parent_dir = normpath(os.path.dirname(node))
-            
+
             # First try parent directory
-            if parent_dir and parent_dir != node:
-                if parent_dir not in close_list and not any(n[0] == parent_dir for n in open_list):
-                    parent_g = FileProcessing().count_files_in_directory(node)
-                    parent_h = self.heuristic(
-                        FileProcessing().count_files_in_directory(parent_dir),
-                        FileProcessing().count_files_in_directory(goal)
-                    )
-                    parent_f = parent_g + parent_h
-                    print(f"Adding parent to open list: {parent_dir}, g={parent_g}, h={parent_h}, f={parent_f}")
-                    open_list.append((parent_dir, parent_g, parent_h, parent_f))
-                    parents[parent_dir] = node
-                    print(f"Set parent relationship: {parent_dir} -> {node}")
-                else:
-                    print(f"Parent {parent_dir} already in close list or open list, trying grandparent")
-                    # If parent is already processed, try grandparent
-                    grandparent_dir = normpath(os.path.dirname(parent_dir))
-                    if grandparent_dir and grandparent_dir != parent_dir:
-                        if grandparent_dir not in close_list and not any(n[0] == grandparent_dir for n in open_list):
-                            grandparent_g = FileProcessing().count_files_in_directory(parent_dir)
-                            grandparent_h = self.heuristic(
-                                FileProcessing().count_files_in_directory(grandparent_dir),
-                                FileProcessing().count_files_in_directory(goal)
-                            )
-                            grandparent_f = grandparent_g + grandparent_h
-                            print(f"Adding grandparent to open list: {grandparent_dir}, g={grandparent_g}, h={grandparent_h}, f={grandparent_f}")
-                            open_list.append((grandparent_dir, grandparent_g, grandparent_h, grandparent_f))
-                            parents[grandparent_dir] = parent_dir
-                            print(f"Set grandparent relationship: {grandparent_dir} -> {parent_dir}")
-                        else:
-                            print(f"Grandparent {grandparent_dir} already in close list or open list")
-                    else:
-                        print(f"Already at root directory {parent_dir}, cannot go higher")
+            if parent_dir and parent_dir != node and self.file_processing.admit(parent_dir):
+                if parent_dir not in close_list and parent_dir not in open_list:
+                    return self.push_forward(open_list, close_list, node, parent_dir,
+                                             FileProcessing.count_files_in_directory(parent_dir))
+                print(f"Parent {parent_dir} already in close list or open list, trying grandparent")
+                # If parent is already processed, try grandparent
+                grandparent_dir = normpath(os.path.dirname(parent_dir))
+                if grandparent_dir and grandparent_dir != parent_dir and self.file_processing.admit(grandparent_dir):
+                    # The grandparent hangs from the parent, which has a g-score once it was reached
+                    via = parent_dir if parent_dir in self.forward_g else node
+                    return self.push_forward(open_list, close_list, via, grandparent_dir,
+                                             FileProcessing.count_files_in_directory(grandparent_dir))
+                print(f"Already at root directory {parent_dir}, cannot go higher")
             else:
                 print(f"Already at root directory {node}, cannot go higher")
+            return False
 
-        # Process regular neighbors if any exist
+        # Process regular neighbors, the file count of a closed one is never read
         for neighbor in neighbors:
             dir_name = neighbor["dir_name"]
-            value = neighbor["value"]
             status = neighbor["status"]
-            print(f"Processing neighbor: {dir_name}, value={value}, status={status}")
 
             if dir_name in close_list:
                 print(f"Neighbor {dir_name} already in close list, skipping")
                 continue
 
-            if dir_name not in close_list and not any(n[0] == dir_name for n in open_list):
-                new_g = FileProcessing().count_files_in_directory(node) + 1
-                new_h = self.heuristic(value, FileProcessing().count_files_in_directory(goal))
-                new_f = new_g + new_h
-                print(f"Adding new neighbor to open list: {dir_name}, g={new_g}, h={new_h}, f={new_f}")
-                open_list.append((dir_name, new_g, new_h, new_f))
-                parents[dir_name] = node
-
+            if dir_name not in open_list:
+                try:
+                    value = neighbor["value"]
+                except (PermissionError, FileNotFoundError):
+                    print(f"ACCESS DENIED to {dir_name}. Skipping this directory.")
+                    continue
+                if self.push_forward(open_list, close_list, node, dir_name, value):
+                    return True
                 if status == "vulnerable":
                     print(f"Neighbor {dir_name} is vulnerable, infecting...")
                     self._infect_directory(dir_name, close_list)
+        return False
+
+    def climb(self, node, open_list, close_list):
+        """
+        Backward expansion. The only predecessor of node in the directory tree is its parent, a free dirname
+        lookup, so the backward search needs no listing. True when the parent meets the forward search.
+        """
+        parent_dir = normpath(os.path.dirname(node))
+        if parent_dir == node or parent_dir in close_list or parent_dir in open_list:
+            return False
+        if not self.file_processing.admit(parent_dir):
+            print(f"Backward search cannot climb to {parent_dir}")
+            return False
+        # One predecessor at a time, the g-score alone orders the backward frontier
+        g = self.backward_g[node] + 1
+        print(f"Climbing backward to {parent_dir}, g={g}")
+        open_list.push(parent_dir, g)
+        self.backward_g[parent_dir] = g
+        self.backward_parents[parent_dir] = node
+        return parent_dir in self.forward_parents and self.meet(parent_dir)
 
     def ebs_astar(self):
-        """Enhanced Bidirectional A* Search with built-in timeout"""
+        """
+        Enhanced Bidirectional A* Search
+        Returns:
+        - Path
+        - Target Found
+        - Elapsed Time
+        - Infected Nodes
+        - Infected Files
+        """
+        return run_search(self.steps())
+
+    def anytime(self, interval=0.1, deadline=None):
+        """Yield a Progress every interval seconds until the search ends or the deadline in seconds passes"""
+        return anytime(self, interval, deadline)
+
+    def steps(self):
+        """The search as a generator, it yields a Progress when one is due and returns the result"""
         print("Starting EBS A* search")
         current_dir = normpath(self.current_dir)
-        path = self._reconstruct_path(self.forward_parents, self.backward_parents, self.intersection_node)
         self.target_found = False
         
-        # Initialize data structures
+        # Initialize data structures, the file counts of both ends are read once
+        self.goal_count = FileProcessing.count_files_in_directory(self.ending_path)
         start_node = (current_dir, 0,
-                      self.heuristic(FileProcessing().count_files_in_directory(current_dir),
-                                     FileProcessing().count_files_in_directory(self.ending_path)), 0)
-        goal_node = (self.ending_path, 0,
-                     self.heuristic(FileProcessing().count_files_in_directory(self.ending_path),
-                                    FileProcessing().count_files_in_directory(current_dir)), 0)
+                      self.heuristic(FileProcessing.count_files_in_directory(current_dir), self.goal_count), 0)
+        goal_node = (self.ending_path, 0, 0, 0)
 
         print(f"Start node: {start_node}")
         print(f"Goal node: {goal_node}")
 
-        OPEN_LIST_1 = [start_node]
-        OPEN_LIST_2 = [goal_node]
+        # Binary heaps keyed by directory, the lowest f score is popped first
+        OPEN_LIST_1 = Frontier(keyed=True)
+        OPEN_LIST_1.push(start_node[0], start_node[3])
+        OPEN_LIST_2 = Frontier(keyed=True)
+        OPEN_LIST_2.push(goal_node[0], goal_node[3])
         CLOSE_LIST_1 = set()
         CLOSE_LIST_2 = set()
         self.forward_parents = {current_dir: None}
         self.backward_parents = {self.ending_path: None}
+        # Accumulated costs from each end, computed once when a directory is reached
+        self.forward_g = {current_dir: 0}
+        self.backward_g = {self.ending_path: 0}
+        forward_depth = 0  # g of the last forward expansion
 
-        intersection_node = None
-
-        # Start timer thread if time limit is set
-        timer_thread = None
-        if self.run_time_min > 0:
+        if self.run_time_min > 0 and self.deadline is None:
             print(f"Setting timer for {self.run_time_min} minutes")
             self.start_time = time.perf_counter()
-            timer_thread = threading.Thread(target=timer, args=(self.start_time, self.run_time_min, self.stop_event))
-            timer_thread.daemon = True
-            timer_thread.start()
+            self.targets.start_time = self.start_time
+            self.milestones.start_time = self.start_time
+        if self.deadline is None:
+            self.deadline = Deadline(self.start_time, self.run_time_min * 60)
 
-        while OPEN_LIST_1 and OPEN_LIST_2:
+        while OPEN_LIST_1 or OPEN_LIST_2:
             print("\n--- New iteration ---")
             print(f"OPEN_LIST_1 size: {len(OPEN_LIST_1)}")
             print(f"OPEN_LIST_2 size: {len(OPEN_LIST_2)}")
             print(f"CLOSE_LIST_1 size: {len(CLOSE_LIST_1)}")
             print(f"CLOSE_LIST_2 size: {len(CLOSE_LIST_2)}")
-            
+
             # Check if the runtime limit has been reached
-            if self.stop_event.is_set():
+            if self.deadline.expired():
                 print("TIME LIMIT REACHED. Stopping the process.")
-                path = self._reconstruct_path(self.forward_parents, self.backward_parents, self.intersection_node)
-                print(f"Current path: {path}")
-                results_in_file(
-                    path,
-                    self.target_found,
-                    time.perf_counter() - self.start_time,
-                    self.infected_nodes,
-                    self.infected_files,
-                    "Enhanced_BiDirectional_A_Search",
-                    self.file_limit
-                )
-                return [
-                    path,
-                    self.target_found,
-                    time.perf_counter() - self.start_time,
-                    self.infected_nodes,
-                    self.infected_files
-                ]
-            
-            # Check file limit condition
-            if self.file_limit:
-                for limit in self.file_limit:
-                    if limit not in self.logged_limits and file_limit_reached(self.infected_files, limit):
-                        print(f"FILE LIMIT {limit} REACHED at {self.infected_files} files")
-                        results_in_file(
-                            path,
-                            self.target_found,
-                            time.perf_counter() - self.start_time,
-                            self.infected_nodes,
-                            self.infected_files,
-                            "Enhanced_BiDirectional_A_Search",
-                            limit
-                        )
-                        self.logged_limits.append(limit)
+                break
+
+            self.milestones.check(self.infected_files, self.infected_nodes, self.intersection_node, self.target_found)
 
             print(f"Infected Files: {self.infected_files}")
             print(f"Infected Nodes: {self.infected_nodes}")
-            print(f"Intersection Node: {intersection_node}")
+            print(f"Intersection Node: {self.intersection_node}")
 
-            # Forward search
-            if OPEN_LIST_1:
-                current_s = min(OPEN_LIST_1, key=lambda x: x[3])
-                OPEN_LIST_1.remove(current_s)
-                current_s_node = current_s[0]
-                CLOSE_LIST_1.add(current_s_node)
-                print(f"Forward search processing: {current_s_node}")
-
-                if current_s_node in CLOSE_LIST_2:
-                    intersection_node = current_s_node
-                    self.intersection_node = intersection_node
-                    print(f"INTERSECTION FOUND at {intersection_node}")
-                    path = self._reconstruct_path(self.forward_parents, self.backward_parents, intersection_node)
-                    if self.validate_path(path):
-                        self.target_found = True
-                        print(f"VALID PATH FOUND: {path}")
-                        if self.file_limit:
-                            for limit in self.file_limit:
-                                if limit not in self.logged_limits and file_limit_reached(self.infected_files, limit):
-                                    print(f"File limit {limit} reached after path found")
-                                    results_in_file(
-                                        path,
-                                        self.target_found,
-                                        time.perf_counter() - self.start_time,
-                                        self.infected_nodes,
-                                        self.infected_files,
-                                        "Enhanced_BiDirectional_A_Search",
-                                        limit
-                                    )
-                                    self.logged_limits.append(limit)
-                        break
-
-                self.search(current_s_node, OPEN_LIST_1, CLOSE_LIST_1, self.ending_path, True, self.forward_parents)
-
-            # Backward search
-            if OPEN_LIST_2:
-                current_e = min(OPEN_LIST_2, key=lambda x: x[3])
-                OPEN_LIST_2.remove(current_e)
-                current_e_node = current_e[0]
+            # Balanced scheduling, the free backward climb only goes as far from the ending path as the forward
+            # search has gone from the start, the g of the next climb against the g of the last forward expansion
+            if OPEN_LIST_2 and (not OPEN_LIST_1 or OPEN_LIST_2.peek()[0] <= forward_depth):
+                _, current_e_node = OPEN_LIST_2.pop()
                 CLOSE_LIST_2.add(current_e_node)
                 print(f"Backward search processing: {current_e_node}")
 
-                if current_e_node in CLOSE_LIST_1:
-                    intersection_node = current_e_node
-                    self.intersection_node = intersection_node
-                    print(f"INTERSECTION FOUND at {intersection_node}")
-                    path = self._reconstruct_path(self.forward_parents, self.backward_parents, intersection_node)
-                    if self.validate_path(path):
-                        self.target_found = True
-                        print(f"VALID PATH FOUND: {path}")
-                        break
+                # The start directory is reached by the forward search before anything is popped
+                if current_e_node in self.forward_parents and self.meet(current_e_node):
+                    break
+                if self.climb(current_e_node, OPEN_LIST_2, CLOSE_LIST_2):
+                    break
+                continue
 
-                self.search(current_e_node, OPEN_LIST_2, CLOSE_LIST_2, current_dir, False, self.backward_parents)
+            # Forward search
+            _, current_s_node = OPEN_LIST_1.pop()
+            # The start directory and every directory not infected yet are checked when popped
+            if current_s_node not in CLOSE_LIST_1:
+                self.check_targets(current_s_node)
+            CLOSE_LIST_1.add(current_s_node)
+            forward_depth = self.forward_g.get(current_s_node, forward_depth)
+            print(f"Forward search processing: {current_s_node}")
+            if self.progress.due(current_s_node):
+                yield self.progress.snapshot(self, lambda node: reconstruct_path(self.forward_parents, current_dir, node),
+                                             len(OPEN_LIST_1) + len(OPEN_LIST_2))
+
+            if current_s_node in self.backward_parents and self.meet(current_s_node):
+                break
+            if self.targets.done or self.search(current_s_node, OPEN_LIST_1, CLOSE_LIST_1):
+                break
+
+        path = self.report_path(self.intersection_node if self.intersection_node is not None else self.found_node)
 
         # Log results after the search loop finishes
         print("Search loop ended")
@@ -306,65 +356,56 @@ class EBSAStar:
         print(f"Total infected files: {self.infected_files}")
         print(f"Total infected nodes: {self.infected_nodes}")
         
+        self.milestones.flush()
         results_in_file(
             path,
             self.target_found,
             time.perf_counter() - self.start_time,
             self.infected_nodes,
             self.infected_files,
-            "Enhanced_BiDirectional_A_Search",
-            self.file_limit
+            self.result_name,
+            self.file_limit,
+            error_rate=estimated_error(self)
         )
-        return [
-                path,
-                self.target_found,
-                time.perf_counter() - self.start_time,
-                self.infected_nodes,
-                self.infected_files
-                ]
+        return search_result(path, self.target_found, self.start_time, self.infected_nodes, self.infected_files)
 
     def has_direct_connection(self, node1, node2):
         """Check if two nodes are directly connected (parent-child or share grandparent)"""
-        print(f"Checking direct connection between {node1} and {node2}")
-        p1 = Path(node1)
-        p2 = Path(node2)
-
-        # Direct parent-child relationship
-        if p1 in p2.parents or p2 in p1.parents:
-            print("Direct parent-child relationship found")
-            return True
-
-        # Share common parent within 2 levels
-        common = set(p1.parents) & set(p2.parents)
-        if common and min(len(p.parts) for p in common) >= min(len(p1.parts), len(p2.parts)) - 2:
-            print(f"Common parent found within 2 levels: {common}")
-            return True
-
-        print("No direct connection found")
-        return False
+        parts1, parts2 = path_parts(node1), path_parts(node2)
+        return directly_connected(parts1, parts2, shared_depth(parts1, parts2))
 
     def smoothing(self, path):
-        print(f"Smoothing path: {path}")
+        """
+        Keep, from each directory of the path, only the furthest one it is directly connected to.
+        The components are split once and a pair is compared from the prefix already known to be shared,
+        so a path is smoothed in about one pass over its components.
+        """
         if len(path) <= 2:
-            print("Path too short, no smoothing needed")
             return path
 
+        parts = [path_parts(p) for p in path]
+        adjacent = [shared_depth(a, b) for a, b in zip(parts, parts[1:])]
         smoothed = [path[0]]
         i = 0
-
-        while i < len(path):
+        while i < len(path) - 1:
             j = i + 1
-            while j < len(path):
-                if self.has_direct_connection(path[i], path[j]):
-                    j += 1
-                else:
+            shared = adjacent[i]
+            while j + 1 < len(path):
+                # i and j + 1 share at least what both i, j and j, j + 1 share
+                following = shared_depth(parts[i], parts[j + 1], min(shared, adjacent[j]))
+                if not directly_connected(parts[i], parts[j + 1], following):
                     break
-            smoothed.append(path[j - 1])
-            i = j - 1
-
-        print(f"Smoothed path: {smoothed}")
+                j += 1
+                shared = following
+            smoothed.append(path[j])
+            i = j
         return smoothed
 
+    def report_path(self, node):
+        """Path through node as it is reported in the results and the milestones"""
+        path = self._reconstruct_path(self.forward_parents, self.backward_parents, node)
+        return self.smoothing(path) if self.smooth_paths else path
+
     def _reconstruct_path(self, forward_parents, backward_parents, intersection):
         """Reconstruct the complete path from both directions and return it as a list."""
         print(f"Reconstructing path with intersection at {intersection}")
@@ -394,24 +435,30 @@ class EBSAStar:
         return full_path
 
     def validate_path(self, path):
-        """Verify the path connects start to end"""
-        print(f"Validating path: {path}")
-        if not path or len(path) < 2:
-            print("Path too short or empty")
+        """
+        Verify the path connects start to end, each directory being an ancestor or a descendant of the next.
+        A single directory is a path when the search starts in the ending path.
+        """
+        if not path:
+            print("Path empty")
             return False
-
-        try:
-            common_path = os.path.commonpath([path[0], path[-1]])
-            exists = os.path.exists(common_path)
-            print(f"Common path: {common_path}, exists: {exists}")
-            return exists
-        except ValueError as e:
-            print(f"Path validation error: {str(e)}")
+        if normpath(path[0]) != normpath(self.current_dir) or normpath(path[-1]) != self.ending_path:
+            print(f"Path does not run from {self.current_dir} to {self.ending_path}")
             return False
 
+        parts = [path_parts(p) for p in path]
+        for k, (a, b) in enumerate(zip(parts, parts[1:])):
+            if shared_depth(a, b) < min(len(a), len(b)):
+                print(f"Path breaks between {path[k]} and {path[k + 1]}")
+                return False
+        return True
+
     def check_duplicates(self):
         from collections import Counter
         print("Checking for duplicate files")
+        if self.processed_files is None:
+            print(f"File paths are only kept with audit_files, {len(self.infected_directories)} infected directories")
+            return
         dupes = Counter(self.processed_files)
         print(f"Total files: {len(self.processed_files)}")
         print(f"Unique files: {len(dupes)}")
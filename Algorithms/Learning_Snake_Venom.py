@@ -1,19 +1,27 @@
-import heapq
 import os
 from datetime import datetime
 from os.path import normpath, abspath
 import random
 import time
-from heapq import heapify
-import threading
 
 from Utils.FileProcessing import FileProcessing
-from Utils.PathingUtil import file_limit_reached, timer
-from Utils.Metrics import results_in_file
-
-
-class VIPER_Mk_III:
-    def __init__(self, starting_path, ending_path, target_file, seed=0, file_limit=None, run_time_min=0):
+from Utils.Targets import TargetSet
+from Utils.NodeIdentity import NodeRegistry
+from Utils.PruneRules import PruneRules
+from Utils.BloomFilter import visited_set
+from Utils.Milestones import MilestoneRecorder
+from Utils.Heuristics import TreeDistance
+from Utils.Toxins import ToxinEffects, BYPASSED, LOCKED, HEMOTOXIN
+from Utils.Anytime import ProgressReporter, run_search, anytime
+from Utils.SearchEngine import SearchPolicy, make_frontier, best_first_search
+
+
+class VIPER_Mk_III(SearchPolicy):
+    path_from_start = True  # custom_reconstruct_path runs from the start to the node
+
+    def __init__(self, starting_path, ending_path, target_file, seed=0, file_limit=None, run_time_min=0, target_dirs=None,
+                 guide_weight=0, follow_symlinks=True, prune_rules=None, node_budget=None,
+                 spill_limit=None, visited_error_rate=None, bidirectional=False):
         self.file_limit = file_limit
         self.run_time_min = run_time_min
         self.logged_limits = []
@@ -22,24 +30,39 @@ class VIPER_Mk_III:
         self.ending_path = normpath(abspath(ending_path))
         self.target_file = target_file
         self.target_found = False
-
-        self.open_nodes = []
-        heapify(self.open_nodes)
-        self.counter = 0
+        self.starting_node = self.starting_path
+        self.result_name = "Snake_Venom_Learning_Version"
+
+        # Binary heap keyed by directory, a stale entry of a re-pushed directory is dropped when popped
+        # spill_limit moves it to disk past that many entries in memory, see SpillFrontier
+        self.frontier = make_frontier(spill_limit)
+        self.costs = {}
+        # Most frontier entries kept in memory, None is unbounded. The worst ones are evicted past it
+        self.node_budget = node_budget
+        self.forgotten = {}  # Reopened parent -> lowest priority of its evicted children
+        # Directories already listed, a duplicate pop is skipped and counted as an avoided re-expansion
+        self.expanded = visited_set(visited_error_rate)  # A Bloom filter when a visited_error_rate is given
+        self.avoided_expansions = 0
 
         self.parent_map = {self.starting_path: self.starting_path}
         self.blocked_directories = set()
 
-        self.locked_files = set()
-        self.bypassed_files = set()
+        self.toxins = ToxinEffects()  # Locked, bypassed and hemotoxin directories
 
         self.infected_nodes = 0
         self.infected_files = 0
         self.myo_count = 0
         self.neuro_count = 0
 
-        self.stop_event = threading.Event()
         self.start_time = time.perf_counter()
+        self.targets = TargetSet(target_file, target_dirs, self.start_time)
+        self.identity = NodeRegistry(follow_symlinks)
+        self.identity.register(self.starting_path)
+        self.prune_rules = prune_rules if prune_rules is not None else PruneRules(self.starting_path)
+        self.file_processing = FileProcessing(self.identity, self.prune_rules)
+        self.milestones = MilestoneRecorder(file_limit, "Snake_Venom_Learning_Version", self.start_time,
+                                            lambda node: self.custom_reconstruct_path(node),
+                                            self.logged_limits)
 
         self.seed = seed if seed != 0 or seed is not None else int(time.time() * 1000)
         random.seed(self.seed)
@@ -47,6 +70,19 @@ class VIPER_Mk_III:
 
         self.concentration = 100  # starts as very pure and degrades over time
 
+        # Meet a backward climb from the target path, see BackwardClimb
+        self.bidirectional = bidirectional
+
+        # Optional pull towards the target path, 0 keeps the pure venom spread
+        self.guide_weight = guide_weight
+        self.tree_distance = TreeDistance([self.ending_path, *(target_dirs or [])])
+
+        # Monotonic deadline set when the search starts, unless anytime() set one
+        self.deadline = None
+        self.progress = ProgressReporter([self.ending_path, *(target_dirs or [])])
+        # Periodic checkpoint of the search state, set by attach_checkpoint
+        self.checkpoint = None
+
         self.memory = {}
 
     def diffusion_flux(self, current_node_value, neighbor_node_value):
@@ -70,23 +106,21 @@ class VIPER_Mk_III:
         return "neurotoxin"
 
     def hemotoxin(self, current_directory):
-        current_directory = normpath(current_directory)
-        for f in os.listdir(current_directory):
-            file_path = os.path.join(current_directory, f)
-            if os.path.isdir(file_path):
-                pass
+        # The file count was read when the directory was reached, no listing here
+        self.toxins.mark(current_directory, HEMOTOXIN, FileProcessing.count_files_in_directory(current_directory))
 
     def toxin_effect(self, current_directory):
-        current_directory = normpath(current_directory)
         mode = self.toxin_decision_effect()
-
-        for file in os.listdir(current_directory):
-            file_path = os.path.join(current_directory, file)
-            if os.path.isfile(file_path):
-                if mode == "myotoxin":
-                    self.bypassed_files.add(file_path)
-                if mode == "neurotoxin":
-                    self.locked_files.add(file_path)
+        effect = {"myotoxin": BYPASSED, "neurotoxin": LOCKED}.get(mode)
+        if effect is not None:
+            # Every file of the directory shares the effect, counted from the snapshot
+            self.toxins.mark(current_directory, effect, FileProcessing.count_files_in_directory(current_directory))
+
+    def guide(self, directory):
+        """Tree distance from the directory to the target path, scaled by the guide weight"""
+        if not self.guide_weight:
+            return 0
+        return self.guide_weight * self.tree_distance(directory)
 
     def toxin_decision_effect(self):
         if hasattr(self, 'seed'):
@@ -118,198 +152,107 @@ class VIPER_Mk_III:
         """
         Returns:
         - Path
+        - Target Found
+        - Elapsed Time
         - Infected Nodes
         - Infected Files
-        - Myotoxin Activation
-        - Neurotoxin Activation
         """
-        current_dir = self.starting_path
-        ending_dir = self.ending_path
-
-        # Initialize cost maps
-        cost_map = {current_dir: self.diffusion_flux(
-            FileProcessing().count_files_in_directory(os.path.dirname(current_dir)),
-            FileProcessing().count_files_in_directory(ending_dir))}
-        estimated_cost_map = {current_dir: 0}
-
-        # Push starting node to heap
-        heapq.heappush(self.open_nodes, (estimated_cost_map[current_dir], self.counter, current_dir))
-        self.counter += 1
-        self.parent_map.update({current_dir: current_dir})
-
-        while self.open_nodes:
-            # Get node with lowest estimated cost
-            current_estimated_cost, _, current_dir = heapq.heappop(self.open_nodes)
-            threading.Thread(target=self.toxin_decision_effect).start()
-
-            print(f"Infected nodes:{self.infected_nodes}\n"
-                  f"Infected files:{self.infected_files}\n")
-
-            # Start timer thread if time limit is set
-            timer_thread = None
-            if self.run_time_min > 0:
-                timer_thread = threading.Thread(target=timer, args=(self.start_time, self.run_time_min, self.stop_event))
-                timer_thread.daemon = True
-                timer_thread.start()
-
-            if self.stop_event.is_set():
-                print("Time limit reached. Stopping the process.")
-                path = self.custom_reconstruct_path(current_dir)
-                print(f"Path: {path}")
-                results_in_file(
-                    path,
-                    self.target_found,
-                    time.perf_counter() - self.start_time,
-                    self.infected_nodes,
-                    self.infected_files,
-                    "Snake_Venom_Learning_Version",
-                    self.file_limit
-                )
-                return [
-                    path,
-                    self.target_found,
-                    time.perf_counter() - self.start_time,
-                    self.infected_nodes,
-                    self.infected_files
-                ] 
-
-            if self.file_limit is not None:
-                for limit in self.file_limit:
-                    if limit not in self.logged_limits and file_limit_reached(self.infected_files, limit):
-                        self.logged_limits.append(limit)
-                        print(f"Logged Limits: {self.logged_limits}\n"
-                              f"I'm Here Processing")
-                        path = self.custom_reconstruct_path(current_dir)
-                        print(f"Path: {path}")
-                        results_in_file(
-                            path,
-                            self.target_found,
-                            time.perf_counter() - self.start_time,
-                            self.infected_nodes,
-                            self.infected_files,
-                            "Snake_Venom_Learning_Version",
-                            limit
-                        )
-                        print("I'm done")
-                        break
-
-            try:
-                if self.target_file in os.listdir(current_dir):
-                    print(f"Found target file: {self.target_file}")
-                    self.target_found = True
-
-                    path = self.custom_reconstruct_path(current_dir)
-                    results_in_file(
-                        path,
-                        self.target_found,
-                        time.perf_counter() - self.start_time,
-                        self.infected_nodes,
-                        self.infected_files,
-                        "Snake_Venom_Learning_Version",
-                        self.file_limit
-                    )
-
-                    return [
-                        path,
-                        self.infected_files,
-                        self.infected_nodes,
-                        self.myo_count,
-                        self.neuro_count
-                    ]
-            except PermissionError:
-                print(f"Access denied to {current_dir}; Skipping...")
-                continue
-
-            # Explore subdirectories
-            try:
-                next_dirs = FileProcessing().get_all_directories_with_file_counts(current_dir)
-            except PermissionError:
-                print(f"Access denied to {current_dir}; Skipping...")
-                continue
-
-            self.hemotoxin(current_dir)
-            self.memorize_directory(current_dir, file_count=FileProcessing().count_files_in_directory(current_dir), has_target=self.target_file in os.listdir(current_dir) if not self.target_found else True)
-
-            if next_dirs:
-                for directory in next_dirs:
-                    dir_name = normpath(directory["dir_name"])
-                    value = directory["value"]
-                    status = directory["status"]
-
-                    if dir_name in self.blocked_directories:
-                        print(f"Directory {dir_name} is blocked. Moving to next directory...")
-                        continue
-
-                    # Check memory before proceeding
-                    if self.should_explore(dir_name):
-                        if status == "vulnerable":
-                            directory["status"] = "infected"
-                            self.blocked_directories.add(current_dir)
-
-                        self.parent_map[dir_name] = current_dir
-                        new_cost = (cost_map[current_dir] +
-                                    self.diffusion_flux(
-                                        cost_map[current_dir],
-                                        FileProcessing().count_files_in_directory(ending_dir))
-                                    )
-                        self.infected_nodes += 1
-
-                        if dir_name not in cost_map or new_cost < cost_map[dir_name]:
-                            cost_map[dir_name] = new_cost
-                            estimated_cost = (new_cost +
-                                              self.diffusion_flux(
-                                                  cost_map[dir_name],
-                                                  FileProcessing().count_files_in_directory(ending_dir))
-                                              )
-                            estimated_cost_map[dir_name] = estimated_cost
-                            heapq.heappush(self.open_nodes, (estimated_cost, self.counter, dir_name))
-                            self.counter += 1
-
-                            # Count infected files
-                        try:
-                            for file in os.listdir(dir_name):
-                                file_path = os.path.join(dir_name, file)
-                                if os.path.isfile(file_path):
-                                    self.infected_files += 1
-                        except PermissionError:
-                            print(f"Access denied to {dir_name}; Skipping...")
-                            continue
-                    else:
-                        print(f"Directory {dir_name} skipped based on memory.")
-
-            # Move to parent directory
-            parent_dir = normpath(os.path.dirname(current_dir))
-            if parent_dir != current_dir and parent_dir not in self.blocked_directories:
-                print(f"No more Subdirectories, moving up to {parent_dir}")
-                parent_dir_file_count = FileProcessing().count_files_in_directory(parent_dir)
-
-                self.parent_map[parent_dir] = current_dir
-                estimated_cost = parent_dir_file_count
-                heapq.heappush(self.open_nodes, (estimated_cost, self.counter, parent_dir))
-                self.counter += 1
-                cost_map[parent_dir] = parent_dir_file_count
-                self.memorize_directory(parent_dir, file_count=parent_dir_file_count) # Memorize parent directory
-
-        return [
-            self.custom_reconstruct_path(current_dir),
-            self.infected_files,
-            self.infected_nodes,
-            self.myo_count,
-            self.neuro_count
-        ]
+        return run_search(self.steps())
+
+    def anytime(self, interval=0.1, deadline=None):
+        """Yield a Progress every interval seconds until the search ends or the deadline in seconds passes"""
+        return anytime(self, interval, deadline)
+
+    def steps(self):
+        """The search as a generator, it yields a Progress when one is due and returns the result"""
+        return best_first_search(self)
+
+    # Policy of the search engine
+    def start(self, node):
+        self.parent_map[node] = node
+        return self.diffusion_flux(FileProcessing.count_files_in_directory(os.path.dirname(node)),
+                                   FileProcessing.count_files_in_directory(self.ending_path)), 0
+
+    def on_pop(self, node):
+        print(f"Infected nodes:{self.infected_nodes}\n"
+              f"Infected files:{self.infected_files}\n"
+              f"Avoided re-expansions:{self.avoided_expansions}\n")
+
+    def visit(self, node):
+        if node in self.expanded:
+            self.avoided_expansions += 1
+            return False
+
+        self.expanded.add(node)
+        return True
+
+    def expand(self, node, found_targets):
+        next_dirs = self.file_processing.get_all_directories_with_file_counts(node)
+        self.hemotoxin(node)
+        # The toxin decision is drawn for the expanded directory, before the costs of its children
+        self.toxin_effect(node)
+        self.memorize_directory(node, file_count=FileProcessing.count_files_in_directory(node),
+                                has_target=bool(found_targets))
+        return next_dirs
+
+    def skip(self, node, child):
+        # An expanded directory was already counted, reached again from below it is not pushed back
+        if child in self.expanded:
+            return True
+        if child in self.blocked_directories:
+            print(f"Directory {child} is blocked. Moving to next directory...")
+            return True
+
+        # Check memory before proceeding
+        if not self.should_explore(child):
+            print(f"Directory {child} skipped based on memory.")
+            return True
+        return False
+
+    def cost(self, node, entry):
+        return self.costs[node] + self.diffusion_flux(self.costs[node], FileProcessing.count_files_in_directory(self.ending_path))
+
+    def on_child(self, node, child, entry, improved):
+        if entry["status"] == "vulnerable":
+            entry["status"] = "infected"
+            self.blocked_directories.add(node)
+
+        self.parent_map.setdefault(child, node)  # First discovery wins, re-parenting a reached node can form a cycle
+        self.count_node()
+
+    def priority(self, child, cost):
+        return cost + self.diffusion_flux(cost, FileProcessing.count_files_in_directory(self.ending_path)) + self.guide(child)
+
+    def may_climb(self, node, parent):
+        # Every child of an expanded parent would push it back, it is only offered while it is neither queued nor expanded
+        return parent not in self.blocked_directories and parent not in self.expanded and parent not in self.frontier
+
+    def climb(self, node, parent):
+        print(f"No more Subdirectories, moving up to {parent}")
+        parent_file_count = FileProcessing.count_files_in_directory(parent)
+
+        self.parent_map.setdefault(parent, node)
+        self.frontier.push(parent, parent_file_count + self.guide(parent))
+        self.costs[parent] = parent_file_count
+        self.memorize_directory(parent, file_count=parent_file_count)  # Memorize parent directory
+
+    def reopen(self, node):
+        self.expanded.discard(node)
+
+    def path_to(self, node):
+        return self.custom_reconstruct_path(node)
 
     def memorize_directory(self, directory_path, **info):
         directory_path = normpath(directory_path)
-        if directory_path not in self.memory:
-            self.memory[directory_path] = {}
-        self.memory[directory_path].update(info)
+        # Replaced and not updated in place, a checkpoint journals the directories memorized since the last one
+        self.memory[directory_path] = {**self.memory.get(directory_path, {}), **info}
         print(f"Memorized information about: {directory_path} - {self.memory[directory_path]}")
 
     def should_explore(self, directory_path):
         directory_path = normpath(directory_path)
         if directory_path in self.memory:
             memory_data = self.memory[directory_path]
-            if memory_data.get('has_target') is False and self.target_found is False:
+            if memory_data.get('has_target') is False and not self.targets.done:
                 print(f"Memory suggests skipping: {directory_path}")
                 return False
         return True
\ No newline at end of file
@@ -0,0 +1,57 @@
+from Algorithms import First_Version_Venom, Second_Version_Venom, Latest_Version_Venom, Learning_Snake_Venom
+from Algorithms import BFO, AStar, EBS_AStar, Dijkstra
+
+# Algorithm name -> (class, search method)
+ALGORITHMS = {
+    "VIPER": (First_Version_Venom.VIPER, "viper"),
+    "MkI": (Second_Version_Venom.VIPER_Mk_I, "mk_i"),
+    "MkII": (Latest_Version_Venom.VIPER_Mk_II, "mk_ii"),
+    "MkIII": (Learning_Snake_Venom.VIPER_Mk_III, "mk_iii"),
+    "A_Star": (AStar.AStar, "a_star"),
+    "EBS": (EBS_AStar.EBSAStar, "ebs_astar"),
+    "Dijkstra": (Dijkstra.Dijkstra, "dijkstra"),
+    "BFO": (BFO.BacterialForaging, "run")
+}
+
+# Optional settings each algorithm accepts, anything else is ignored by build_algorithm
+ALGORITHM_OPTIONS = {
+    "VIPER": ("guide_weight", "follow_symlinks", "prune_rules", "node_budget", "spill_limit", "visited_error_rate",
+              "bidirectional"),
+    "MkI": ("guide_weight", "follow_symlinks", "prune_rules", "node_budget", "spill_limit", "visited_error_rate",
+              "bidirectional"),
+    "MkII": ("guide_weight", "follow_symlinks", "prune_rules", "node_budget", "spill_limit", "visited_error_rate",
+              "bidirectional"),
+    "MkIII": ("guide_weight", "follow_symlinks", "prune_rules", "node_budget", "spill_limit", "visited_error_rate",
+              "bidirectional"),
+    "A_Star": ("heuristic", "follow_symlinks", "prune_rules", "node_budget", "spill_limit", "visited_error_rate"),
+    "EBS": ("follow_symlinks", "prune_rules", "visited_error_rate", "smooth_paths", "audit_files"),
+    "Dijkstra": ("follow_symlinks", "prune_rules", "node_budget", "spill_limit", "visited_error_rate"),
+    "BFO": ("follow_symlinks", "prune_rules", "visited_error_rate", "population", "audit_files")
+}
+
+# Names used in the thesis for the venom versions
+ALIASES = {
+    "SVT": "VIPER",
+    "SVT_A": "MkI",
+    "SVT_B": "MkII",
+    "SVT_C": "MkIII"
+}
+
+
+def build_algorithm(name, starting_path, target_path, target_file, file_limit=None, run_time_min=0, target_dirs=None,
+                    **options):
+    """Create an algorithm by name and return it with its search method.
+    target_file can be a single file name or a list of them.
+    options are only passed on to the algorithms that accept them, see ALGORITHM_OPTIONS."""
+    name = ALIASES.get(name, name)
+    if options.get("node_budget") and options.get("visited_error_rate") and "node_budget" in ALGORITHM_OPTIONS[name]:
+        raise ValueError("a node budget reopens expanded directories, it cannot be used with a visited_error_rate")
+    algorithm_class, method_name = ALGORITHMS[name]
+    accepted = {key: value for key, value in options.items() if key in ALGORITHM_OPTIONS[name] and value is not None}
+    algo = algorithm_class(starting_path, target_path, target_file, file_limit=file_limit, target_dirs=target_dirs,
+                           **accepted)
+
+    if run_time_min != 0:
+        algo.run_time_min = run_time_min
+
+    return algo, getattr(algo, method_name)
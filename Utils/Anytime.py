@@ -0,0 +1,92 @@
+import time
+from collections import namedtuple
+
+from Utils.Heuristics import TreeDistance
+
+# Snapshot of a running search, the final one carries the same values as the returned result
+Progress = namedtuple("Progress", ["path", "target_found", "elapsed", "infected_nodes", "infected_files",
+                                   "frontier_size", "final"])
+
+
+def search_result(path, target_found, start_time, infected_nodes, infected_files):
+    """The shape every search returns: [path, target found, elapsed, infected nodes, infected files]."""
+    return [path, target_found, time.perf_counter() - start_time, infected_nodes, infected_files]
+
+
+class Deadline:
+    """
+    A point on the monotonic perf_counter clock, checked on every iteration instead of by a polling timer thread.
+    No seconds, or 0, never expires.
+    """
+    def __init__(self, start_time, seconds):
+        self.end_ns = int(start_time * 1e9) + int(seconds * 1e9) if seconds else None
+
+    def expired(self):
+        return self.end_ns is not None and time.perf_counter_ns() >= self.end_ns
+
+    def remaining(self):
+        if self.end_ns is None:
+            return float("inf")
+        return max(0.0, (self.end_ns - time.perf_counter_ns()) / 1e9)
+
+
+class ProgressReporter:
+    """
+    Decides when a search yields a Progress and keeps the best node so far, the one closest to the goals.
+    Inactive until an interval is set, then due() costs one clock read and one tree distance per node.
+    """
+    def __init__(self, goals):
+        self.distance = TreeDistance(goals)
+        self.interval_ns = None
+        self.next_ns = None
+        self.best_node = None
+        self.best_distance = float("inf")
+
+    def set_interval(self, seconds):
+        self.interval_ns = int(seconds * 1e9)
+        self.next_ns = time.perf_counter_ns() + self.interval_ns
+
+    def due(self, node):
+        if self.interval_ns is None:
+            return False
+        distance = self.distance(node)
+        if distance < self.best_distance:
+            self.best_node, self.best_distance = node, distance
+
+        now = time.perf_counter_ns()
+        if now < self.next_ns:
+            return False
+        self.next_ns = now + self.interval_ns
+        return True
+
+    def snapshot(self, search, path_resolver, frontier_size):
+        """Progress of the search object, the path leads to the best node so far."""
+        try:
+            path = path_resolver(self.best_node)
+        except (ValueError, KeyError):
+            path = []
+        return Progress(path, search.target_found, time.perf_counter() - search.start_time,
+                        search.infected_nodes, search.infected_files, frontier_size, False)
+
+
+def run_search(search):
+    """Drain a search generator and return its result."""
+    while True:
+        try:
+            next(search)
+        except StopIteration as stop:
+            return stop.value
+
+
+def anytime(algorithm, interval=0.1, deadline=None):
+    """
+    Run the search of an algorithm, yielding a Progress every interval seconds.
+    deadline is in seconds from now and replaces the run time of the algorithm.
+    The last Progress is final and holds the returned result.
+    """
+    if deadline is not None:
+        algorithm.deadline = Deadline(time.perf_counter(), deadline)
+    algorithm.progress.set_interval(interval)
+    result = yield from algorithm.steps()
+    path, target_found, elapsed, infected_nodes, infected_files = result
+    yield Progress(path, target_found, elapsed, infected_nodes, infected_files, 0, True)
@@ -0,0 +1,113 @@
+import math
+from hashlib import blake2b
+
+
+class _Layer:
+    """One fixed size Bloom filter, sized for capacity items at error_rate."""
+    def __init__(self, capacity, error_rate):
+        self.capacity = capacity
+        self.size = max(8, math.ceil(-capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.hashes = max(1, round(self.size / capacity * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+        self.count = 0
+
+    def positions(self, digest):
+        first, second = digest & 0xFFFFFFFFFFFFFFFF, (digest >> 64) | 1
+        return [(first + i * second) % self.size for i in range(self.hashes)]
+
+    def __contains__(self, digest):
+        bits = self.bits
+        return all(bits[p >> 3] & (1 << (p & 7)) for p in self.positions(digest))
+
+    def add(self, digest):
+        bits = self.bits
+        for p in self.positions(digest):
+            bits[p >> 3] |= 1 << (p & 7)
+        self.count += 1
+
+    def error(self):
+        """False positive rate of the layer with its current fill."""
+        return (1 - math.exp(-self.hashes * self.count / self.size)) ** self.hashes
+
+
+class BloomFilter:
+    """
+    Scalable Bloom filter standing in for a set of visited directories or infected files, for runs where memory
+    matters more than exact counts. A path costs about 1.44 * log2(1 / error_rate) bits instead of its string.
+    Once a layer holds its capacity a layer twice as large with half the error rate is added, so the overall
+    false positive rate stays under error_rate whatever the number of paths.
+    A false positive makes a new path look seen, the directory is skipped or the file is not counted.
+    Paths cannot be removed.
+    """
+    def __init__(self, error_rate=0.001, initial_capacity=100_000):
+        if not 0 < error_rate < 1:
+            raise ValueError(f"The error rate of a Bloom filter has to be between 0 and 1, got {error_rate}")
+        self.error_rate = error_rate
+        self.initial_capacity = initial_capacity
+        self.layers = []
+        self.count = 0
+        # A list while a Checkpoint journals the paths added since its last record
+        self.journal = None
+        self._add_layer()
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state["journal"] = None
+        return state
+
+    def _add_layer(self):
+        level = len(self.layers)
+        self.layers.append(_Layer(self.initial_capacity * 2 ** level, self.error_rate * 0.5 ** (level + 1)))
+
+    @staticmethod
+    def _digest(item):
+        return int.from_bytes(blake2b(str(item).encode("utf-8", "surrogateescape"), digest_size=16).digest(), "little")
+
+    def __contains__(self, item):
+        digest = self._digest(item)
+        return any(digest in layer for layer in self.layers)
+
+    def add(self, item):
+        digest = self._digest(item)
+        if any(digest in layer for layer in self.layers):
+            return
+        layer = self.layers[-1]
+        if layer.count >= layer.capacity:
+            self._add_layer()
+            layer = self.layers[-1]
+        layer.add(digest)
+        self.count += 1
+        if self.journal is not None:
+            self.journal.append(item)
+
+    def discard(self, item):
+        raise TypeError("A Bloom filter cannot forget a path, use an exact set with the node budget")
+
+    def __len__(self):
+        """Paths added, the ones taken for a false positive are not counted."""
+        return self.count
+
+    def estimated_error(self):
+        """Chance that a path never added is reported as seen, with the current fill."""
+        exact = 1.0
+        for layer in self.layers:
+            exact *= 1 - layer.error()
+        return 1 - exact
+
+
+def visited_set(error_rate=None):
+    """An exact set, or a BloomFilter with that false positive rate."""
+    if error_rate:
+        return BloomFilter(error_rate)
+    return set()
+
+
+def estimated_error(search):
+    """Chance that one of the Bloom filters of a search reports a false positive, None when its sets are exact."""
+    filters = [value for value in vars(search).values() if isinstance(value, BloomFilter)]
+    if not filters:
+        return None
+    exact = 1.0
+    for bloom in filters:
+        exact *= 1 - bloom.estimated_error()
+    return 1 - exact
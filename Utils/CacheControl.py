@@ -0,0 +1,96 @@
+import os
+from os.path import normpath, commonpath
+
+from Utils.FileProcessing import FileProcessing
+from Utils.DirectoryIndex import DirectoryIndex
+
+'''
+Cache modes
+> shared: legacy behaviour, every algorithm runs in the same process and sees whatever the previous one cached
+> reset: fresh process per algorithm, the process-level file counts start empty
+> warm: fresh process per algorithm, the tree is walked once beforehand into a DirectoryIndex that answers the
+  listings and file counts of the algorithm, and warms the OS caches on the way
+> cold: fresh process per algorithm, page cache is dropped with posix_fadvise(DONTNEED) where the platform allows it
+'''
+CACHE_MODES = ("shared", "reset", "warm", "cold")
+
+
+def cache_root(starting_path, target_path):
+    """The smallest directory that contains both the start and the target."""
+    try:
+        return commonpath([normpath(starting_path), normpath(target_path)])
+    except ValueError:
+        # Different drives on Windows, fall back to the start
+        return normpath(starting_path)
+
+
+def reset_process_cache():
+    """Forget every directory count cached by FileProcessing."""
+    FileProcessing.clear_counts()
+
+
+def prewarm_index(root, prune_rules=None):
+    """
+    Walk the tree once into a DirectoryIndex and install it, the directories the search prunes are not walked.
+    Returns the number of directories indexed.
+    """
+    index = DirectoryIndex.build(root, prune_rules=prune_rules)
+    FileProcessing.install_index(index)
+    return len(index)
+
+
+def _fadvise_dontneed(path, flags):
+    try:
+        fd = os.open(path, flags)
+    except OSError:
+        return False
+    try:
+        os.posix_fadvise(fd, 0, 0, os.POSIX_FADV_DONTNEED)
+        return True
+    except OSError:
+        return False
+    finally:
+        os.close(fd)
+
+
+def drop_os_cache(root, prune_rules=None):
+    """
+    Ask the kernel to drop cached pages below root, the directories the search prunes are not walked.
+    This only evicts page cache, dentries and inodes stay cached, hence "cold-ish".
+    """
+    if not hasattr(os, "posix_fadvise"):
+        print("posix_fadvise is not available on this platform, cold mode only resets the process cache.")
+        return 0
+
+    dropped = 0
+    directory_flags = os.O_RDONLY | getattr(os, "O_DIRECTORY", 0)
+    for dir_path, dir_names, file_names in os.walk(root):
+        if prune_rules is not None:
+            dir_names[:] = [d for d in dir_names if prune_rules.allows(os.path.join(dir_path, d))]
+        if _fadvise_dontneed(dir_path, directory_flags):
+            dropped += 1
+        for file_name in file_names:
+            if _fadvise_dontneed(os.path.join(dir_path, file_name), os.O_RDONLY):
+                dropped += 1
+    return dropped
+
+
+def prepare_cache(mode, root, prune_rules=None):
+    """
+    Put the caches into the requested state before an algorithm starts.
+    prune_rules are the ones of the search, the walks of warm and cold skip the same directories.
+    """
+    if mode not in CACHE_MODES:
+        raise ValueError(f"Unknown cache mode {mode}. Expected one of {CACHE_MODES}")
+
+    if mode == "shared":
+        return
+
+    reset_process_cache()
+
+    if mode == "warm":
+        warmed = prewarm_index(root, prune_rules)
+        print(f"Pre-warmed an index of {warmed} directories under {root}")
+    elif mode == "cold":
+        dropped = drop_os_cache(root, prune_rules)
+        print(f"Dropped cached pages for {dropped} entries under {root}")
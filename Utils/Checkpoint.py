@@ -0,0 +1,464 @@
+import os
+import copy
+import queue
+import pickle
+import random
+import struct
+import threading
+import time
+import zlib
+from array import array
+
+from Utils.BloomFilter import BloomFilter
+
+# Attributes of a search that are checkpointed, dotted names reach into its helpers. Missing ones are skipped.
+STATE = (
+    "parent_map", "costs", "forgotten", "memory",
+    "expanded", "closed_set", "visited", "blocked_directories", "toxins.ids", "toxins.effects", "toxins.files",
+    "frontier.entries", "frontier.counter",
+    "identity.keys", "identity.owners", "identity.duplicates",
+    "targets.found", "targets.pending_files", "targets.pending_dirs",
+    "milestones.cursor", "milestones.next_threshold", "logged_limits",
+    "infected_nodes", "infected_files", "avoided_expansions", "myo_count", "neuro_count", "target_found", "goal_key",
+)
+
+_HEADER = struct.Struct(">I")
+_MISSING = object()
+_STOP = object()
+
+
+def _resolve(algorithm, name):
+    """Object holding the attribute and the attribute name, None if the search does not have it."""
+    *owners, attribute = name.split(".")
+    obj = algorithm
+    for owner in owners:
+        obj = getattr(obj, owner, None)
+    if obj is None or not hasattr(obj, attribute):
+        return None, attribute
+    return obj, attribute
+
+
+class JournalDict(dict):
+    """
+    dict that remembers the keys set or removed since its last delta.
+    Values are written as they are at the checkpoint, they are replaced and not changed in place.
+    """
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.dirty = set()
+
+    def __reduce__(self):
+        return type(self), (dict(self),)
+
+    def __setitem__(self, key, value):
+        self.dirty.add(key)
+        super().__setitem__(key, value)
+
+    def __delitem__(self, key):
+        super().__delitem__(key)
+        self.dirty.add(key)
+
+    def pop(self, key, *default):
+        if key in self:
+            self.dirty.add(key)
+        return super().pop(key, *default)
+
+    def popitem(self):
+        key, value = super().popitem()
+        self.dirty.add(key)
+        return key, value
+
+    def setdefault(self, key, default=None):
+        if key not in self:
+            self.dirty.add(key)
+        return super().setdefault(key, default)
+
+    def update(self, *args, **kwargs):
+        other = dict(*args, **kwargs)
+        self.dirty.update(other)
+        super().update(other)
+
+    def clear(self):
+        self.dirty.update(self)
+        super().clear()
+
+    def full(self):
+        self.dirty = set()
+        return "dict", dict(self), None
+
+    def delta(self):
+        if not self.dirty:
+            return None
+        dirty, self.dirty = self.dirty, set()
+        changed = {key: self[key] for key in dirty if key in self}
+        return "dict", changed, dirty - changed.keys()
+
+
+class JournalSet(set):
+    """set that remembers the items added or removed since its last delta."""
+    def __init__(self, *args):
+        super().__init__(*args)
+        self.dirty = set()
+
+    def __reduce__(self):
+        return type(self), (set(self),)
+
+    def add(self, item):
+        self.dirty.add(item)
+        super().add(item)
+
+    def discard(self, item):
+        self.dirty.add(item)
+        super().discard(item)
+
+    def remove(self, item):
+        super().remove(item)
+        self.dirty.add(item)
+
+    def pop(self):
+        item = super().pop()
+        self.dirty.add(item)
+        return item
+
+    def update(self, *others):
+        for other in others:
+            other = set(other)
+            self.dirty |= other
+            super().update(other)
+
+    def difference_update(self, *others):
+        for other in others:
+            other = set(other)
+            self.dirty |= other
+            super().difference_update(other)
+
+    def __ior__(self, other):
+        self.update(other)
+        return self
+
+    def __isub__(self, other):
+        self.difference_update(other)
+        return self
+
+    def clear(self):
+        self.dirty |= self
+        super().clear()
+
+    def full(self):
+        self.dirty = set()
+        return "set", set(self), None
+
+    def delta(self):
+        if not self.dirty:
+            return None
+        dirty, self.dirty = self.dirty, set()
+        added = {item for item in dirty if item in self}
+        return "set", added, dirty - added
+
+
+class JournalArray(array):
+    """array that remembers the indexes assigned since its last delta, the items appended after it are its tail."""
+    def __init__(self, typecode, initializer=()):
+        self.dirty = set()
+        self.written = len(self)
+
+    def __reduce__(self):
+        return type(self), (self.typecode, array(self.typecode, self))
+
+    def __setitem__(self, index, value):
+        self.dirty.add(index)
+        super().__setitem__(index, value)
+
+    def full(self):
+        self.dirty = set()
+        self.written = len(self)
+        return "array", self.typecode, {}, 0, array(self.typecode, self)
+
+    def delta(self):
+        start = self.written
+        if not self.dirty and start == len(self):
+            return None
+        changed = {i: self[i] for i in self.dirty if i < start}
+        self.dirty = set()
+        self.written = len(self)
+        return "array", self.typecode, changed, start, array(self.typecode, self[start:])
+
+
+def _journaled(value):
+    """A journaled copy of a dict, set or array, None for the values written in full at every checkpoint."""
+    if isinstance(value, dict):
+        return JournalDict(value)
+    if isinstance(value, set):
+        return JournalSet(value)
+    if isinstance(value, array):
+        return JournalArray(value.typecode, value)
+    return None
+
+
+def _full(value):
+    """Record of a replayed value that replaces it."""
+    if isinstance(value, dict):
+        return "dict", value, None
+    if isinstance(value, set):
+        return "set", value, None
+    if isinstance(value, array):
+        return "array", value.typecode, {}, 0, value
+    if isinstance(value, BloomFilter):
+        return "bloom", value, []
+    return "value", value
+
+
+def _apply(state, name, change):
+    """Replay one record of name into state."""
+    kind = change[0]
+    if kind == "dict" or kind == "set":
+        _, changed, removed = change
+        if removed is None:
+            state[name] = changed
+        elif kind == "dict":
+            current = state.setdefault(name, {})
+            current.update(changed)
+            for key in removed:
+                current.pop(key, None)
+        else:
+            current = state.setdefault(name, set())
+            current |= changed
+            current -= removed
+    elif kind == "array":
+        _, typecode, changed, start, tail = change
+        current = state.get(name) if start else None
+        if current is None:
+            current = state[name] = array(typecode)
+        for i, item in changed.items():
+            current[i] = item
+        del current[start:]
+        current.extend(tail)
+    elif kind == "bloom":
+        _, bloom, added = change
+        if bloom is not None:
+            state[name] = bloom
+        for item in added:
+            state[name].add(item)
+    else:
+        state[name] = change[1]
+
+
+class Checkpoint:
+    """
+    Periodic checkpoints of a best-first search, so a killed run can be resumed where it left off.
+    The file is a journal of zlib compressed pickle records, each one prefixed by its length.
+    The first checkpoint swaps the dicts, sets and arrays of the search for journaled ones that remember what was
+    changed, and Bloom filters keep the paths added to them, so a record is built from the changes alone.
+    The search only hands the record over, a background writer pickles, appends and syncs it.
+    Every compact_every records the writer replays the journal into one full record written into a temporary file
+    that replaces it, and a torn record at the end, from a crash while appending, is ignored on load.
+    """
+    def __init__(self, path, interval=60, compact_every=64):
+        self.path = path
+        self.interval_ns = int(interval * 1e9)
+        self.next_ns = time.perf_counter_ns() + self.interval_ns
+        self.compact_every = compact_every
+        self.records = 0
+        self.written = {}  # name -> copy of the last plain value written, these are small
+        self._queue = queue.Queue()
+        self._writer = None
+
+    def due(self):
+        now = time.perf_counter_ns()
+        if now < self.next_ns:
+            return False
+        self.next_ns = now + self.interval_ns
+        return True
+
+    def tick(self, algorithm):
+        """Save when the interval is up, called by the search loop between two expansions."""
+        if self.due():
+            self.save(algorithm)
+
+    def delta(self, name, obj, attribute):
+        """What changed in the attribute since it was last written, the first time all of it."""
+        value = getattr(obj, attribute)
+        if isinstance(value, (JournalDict, JournalSet, JournalArray)):
+            return value.delta()
+
+        if isinstance(value, BloomFilter):
+            if value.journal is None:
+                value.journal = []
+                return "bloom", copy.deepcopy(value), []
+            if not value.journal:
+                return None
+            added, value.journal = value.journal, []
+            return "bloom", None, added
+
+        journaled = _journaled(value)
+        if journaled is not None:
+            # A new container, the search replaced it or it was never saved, its changes are tracked from now on
+            setattr(obj, attribute, journaled)
+            return journaled.full()
+
+        if self.written.get(name, _MISSING) == value:
+            return None
+        self.written[name] = copy.copy(value)
+        return "value", copy.copy(value)
+
+    def save(self, algorithm):
+        delta = {}
+        for name in STATE:
+            obj, attribute = _resolve(algorithm, name)
+            if obj is None:
+                continue
+            change = self.delta(name, obj, attribute)
+            if change is not None:
+                delta[name] = change
+
+        record = {"elapsed": time.perf_counter() - algorithm.start_time, "random": random.getstate(), "delta": delta}
+        if self._writer is None:
+            self._writer = threading.Thread(target=self._write_loop, daemon=True)
+            self._writer.start()
+        self._queue.put(record)
+
+    def _write_loop(self):
+        while True:
+            record = self._queue.get()
+            try:
+                if record is _STOP:
+                    return
+                self.write(record)
+            except OSError as e:
+                print(f"Could not write the checkpoint {self.path}: {e}")
+            finally:
+                self._queue.task_done()
+
+    def write(self, record):
+        if self.records == 0:
+            # A new journal replaces the one of an earlier run
+            self._replace(record)
+            return
+
+        data = zlib.compress(pickle.dumps(record, pickle.HIGHEST_PROTOCOL))
+        with open(self.path, "ab") as f:
+            f.write(_HEADER.pack(len(data)) + data)
+            f.flush()
+            os.fsync(f.fileno())
+        self.records += 1
+
+        if self.records >= self.compact_every:
+            state, last, _, _ = self._replay()
+            self._replace({"elapsed": last["elapsed"], "random": last["random"],
+                           "delta": {name: _full(value) for name, value in state.items()}})
+
+    def _replace(self, record):
+        # A full record replaces the journal atomically, a crash leaves either the old or the new one
+        data = zlib.compress(pickle.dumps(record, pickle.HIGHEST_PROTOCOL))
+        temporary = self.path + ".tmp"
+        with open(temporary, "wb") as f:
+            f.write(_HEADER.pack(len(data)) + data)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temporary, self.path)
+        self.records = 1
+
+    def close(self):
+        """Wait until every record is written and stop the writer, a later save starts a new one."""
+        if self._writer is not None:
+            self._queue.put(_STOP)
+            self._writer.join()
+            self._writer = None
+
+    def _replay(self):
+        """(state, last record, end of the last good record, number of records) of the journal."""
+        state = {}
+        last = None
+        end = 0
+        records = 0
+        with open(self.path, "rb") as f:
+            while True:
+                header = f.read(_HEADER.size)
+                if len(header) < _HEADER.size:
+                    break
+                (size,) = _HEADER.unpack(header)
+                data = f.read(size)
+                try:
+                    record = pickle.loads(zlib.decompress(data))
+                except (zlib.error, pickle.UnpicklingError, EOFError):
+                    print(f"Ignoring a torn record at the end of {self.path}")
+                    break
+
+                for name, change in record["delta"].items():
+                    _apply(state, name, change)
+                last = record
+                end = f.tell()
+                records += 1
+        return state, last, end, records
+
+    def read(self):
+        """Replay the journal into (state, elapsed, random state), None if there is no usable record."""
+        state, last, end, records = self._replay()
+        # The next record is appended right after the last good one
+        with open(self.path, "r+b") as f:
+            f.truncate(end)
+        self.records = records
+
+        if last is None:
+            return None
+        return state, last["elapsed"], last["random"]
+
+    def load(self, algorithm):
+        """Restore the search from the journal, False if there is nothing to resume from."""
+        if not os.path.exists(self.path):
+            return False
+        replayed = self.read()
+        if replayed is None:
+            return False
+        state, elapsed, random_state = replayed
+
+        for name, value in state.items():
+            obj, attribute = _resolve(algorithm, name)
+            if obj is None:
+                continue
+            current = getattr(obj, attribute)
+            journaled = _journaled(value)
+            if journaled is not None:
+                # Already in the journal, only the changes from here on are written
+                setattr(obj, attribute, journaled)
+            elif isinstance(value, BloomFilter):
+                value.journal = []
+                setattr(obj, attribute, value)
+            elif isinstance(current, list):
+                # Filled in place, the milestones share logged_limits with the search
+                current[:] = value
+                self.written[name] = copy.copy(value)
+            else:
+                setattr(obj, attribute, value)
+                self.written[name] = copy.copy(value)
+
+        algorithm.frontier.rebuild()
+        random.setstate(random_state)
+
+        # The clocks continue from the elapsed time of the last record
+        start_time = time.perf_counter() - elapsed
+        algorithm.start_time = start_time
+        algorithm.targets.start_time = start_time
+        algorithm.milestones.start_time = start_time
+        print(f"Resumed {algorithm.result_name} from {self.path} after {elapsed:.2f}s, "
+              f"{len(algorithm.frontier)} directories in the frontier")
+        return True
+
+
+def attach_checkpoint(algorithm, interval, resume=False):
+    """
+    Checkpoint the search into <result name>.checkpoint every interval seconds, after resuming from it if asked.
+    Only the searches running on the shared best-first engine can be checkpointed.
+    """
+    if not hasattr(algorithm, "checkpoint"):
+        print(f"{type(algorithm).__name__} does not support checkpoints")
+        return None
+    if not algorithm.frontier.keyed:
+        print(f"The spilled frontier of {algorithm.result_name} cannot be checkpointed")
+        return None
+
+    checkpoint = Checkpoint(f"{algorithm.result_name}.checkpoint", interval or 60)
+    if resume and not checkpoint.load(algorithm):
+        print(f"No checkpoint to resume from in {checkpoint.path}, starting over")
+    algorithm.checkpoint = checkpoint
+    return checkpoint
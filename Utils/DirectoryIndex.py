@@ -0,0 +1,109 @@
+import os
+import pickle
+from os.path import normpath, join
+
+
+class DirectoryIndex:
+    """
+    A directory tree walked once with os.scandir.
+    Maps every directory to the names of its subdirectories and files, and its (st_dev, st_ino),
+    so many searches can share one walk.
+    """
+    def __init__(self, entries=None, root=None):
+        self.entries = entries if entries is not None else {}  # path -> (subdirectory names, file names, key)
+        self.root = root
+
+    @classmethod
+    def build(cls, root, follow_symlinks=True, prune_rules=None):
+        """
+        Walk root once, directories that cannot be read or were already walked under another name are left out.
+        With PruneRules the pruned directories are not walked either, they are still named in their parent.
+        """
+        root = normpath(os.path.abspath(root))
+        entries = {}
+        walked = set()
+        stack = [root]
+
+        while stack:
+            directory = stack.pop()
+            try:
+                stat = os.stat(directory, follow_symlinks=follow_symlinks)
+            except OSError:
+                continue
+            key = (stat.st_dev, stat.st_ino)
+            if key in walked:
+                continue
+            if prune_rules is not None and directory != root and not prune_rules.allows(directory, key):
+                continue
+            walked.add(key)
+
+            subdirectories = []
+            files = []
+            try:
+                with os.scandir(directory) as scanned:
+                    for entry in scanned:
+                        try:
+                            if entry.is_dir(follow_symlinks=follow_symlinks):
+                                subdirectories.append(entry.name)
+                            elif entry.is_file():
+                                files.append(entry.name)
+                        except OSError:
+                            continue
+            except (PermissionError, FileNotFoundError, NotADirectoryError):
+                continue
+
+            entries[directory] = (tuple(subdirectories), tuple(files), key)
+            stack.extend(join(directory, d) for d in subdirectories)
+
+        return cls(entries, root)
+
+    def save(self, path):
+        with open(path, "wb") as file:
+            pickle.dump((self.root, self.entries), file, protocol=pickle.HIGHEST_PROTOCOL)
+
+    @classmethod
+    def load(cls, path):
+        with open(path, "rb") as file:
+            root, entries = pickle.load(file)
+        return cls(entries, root)
+
+    def covers(self, directory):
+        """Whether directory is the root of the index or below it."""
+        if self.root is None:
+            return False
+        directory = normpath(os.path.abspath(directory))
+        return directory == self.root or directory.startswith(self.root.rstrip(os.sep) + os.sep)
+
+    @classmethod
+    def build_or_load(cls, path, root):
+        """Load the index saved in path when it covers root, otherwise build it from root and save it there."""
+        if os.path.exists(path):
+            print(f"Loading directory index from {path}")
+            index = cls.load(path)
+            if index.covers(root):
+                return index
+            print(f"The index in {path} was built from {index.root}, it does not cover {root}")
+
+        print(f"Building directory index of {root}")
+        index = cls.build(root)
+        index.save(path)
+        print(f"Saved {len(index)} directories to {path}")
+        return index
+
+    def __len__(self):
+        return len(self.entries)
+
+    def __contains__(self, directory):
+        return directory in self.entries
+
+    def subdirectories(self, directory):
+        return self.entries[directory][0]
+
+    def files(self, directory):
+        return self.entries[directory][1]
+
+    def file_count(self, directory):
+        return len(self.entries[directory][1])
+
+    def key(self, directory):
+        return self.entries[directory][2]
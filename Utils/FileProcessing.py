@@ -1,42 +1,185 @@
 import os
 from os.path import normpath, join, isfile
-from functools import lru_cache
+
+# Shared DirectoryIndex, when installed every listing is answered from it before touching the disk
+_index = None
+# File count of every directory counted so far, see count_files_in_directory
+_file_counts = {}
+
 
 class FileProcessing:
-    def __init__(self):
-        pass
+    def __init__(self, identity=None, prune_rules=None):
+        # Optional NodeRegistry, directories already known under another name are left out of the listings
+        self.identity = identity
+        # Optional PruneRules, pruned directories are left out of the listings and never counted
+        self.prune_rules = prune_rules
+        # (directory, subdirectories) of the last scan, kept for the expansion that follows it
+        self.listing = None
+
+    @staticmethod
+    def install_index(index):
+        """Answer listings from a pre-built DirectoryIndex, None goes back to the live filesystem."""
+        global _index
+        _index = index
+        FileProcessing.clear_counts()
+
+    @staticmethod
+    def installed_index():
+        return _index
 
     def get_all_directories_with_file_counts(self, base_path):
-        """Retrieve all directories in the base path along with their file counts."""
+        """
+        Retrieve all directories in the base path as NeighborRecords.
+        Their file count is only read when a caller looks at "value".
+        """
         base_path = normpath(base_path)
         try:
-            directories = [d for d in os.listdir(base_path) if os.path.isdir(os.path.join(base_path, d))]
+            if self.listing is not None and self.listing[0] == base_path:
+                directories = self.listing[1]
+            else:
+                directories = self.subdirectories(base_path)
         except PermissionError:
             print(f"Access denied to {base_path}. Skipping this directory.")
             return []
+        finally:
+            self.listing = None
 
-        if not directories:
-            return []
-
-        directory_info = []
-        for directory in directories:
-            dir_path = os.path.join(base_path, directory)
-            try:
-                file_count = self.count_files_in_directory(dir_path)
-                directory_info.append({"dir_name": dir_path, "value": file_count, "status": "vulnerable"})
-            except PermissionError:
-                print(f"Access denied to {dir_path}. Skipping this directory.")
-                continue
+        return [NeighborRecord(dir_name=dir_path, status="vulnerable") for dir_path in directories]
 
-        return directory_info
+    def subdirectories(self, directory, mtimes=None, files=None):
+        """list_subdirectories with this instance's registry and prune rules."""
+        return FileProcessing.list_subdirectories(directory, self.identity, self.prune_rules, mtimes, files=files)
 
+    def scan(self, directory):
+        """
+        List the directory once for its expansion and return the names of its files, for the target check.
+        The file count is kept from the same scandir pass, and so are the subdirectories for the next
+        get_all_directories_with_file_counts of the directory.
+        """
+        directory = normpath(directory)
+        files = []
+        self.listing = None
+        subdirectories = self.subdirectories(directory, files=files)
+        _file_counts[directory] = len(files)
+        self.listing = directory, subdirectories
+        return files
 
+    def admit(self, directory):
+        """
+        Whether a directory reached outside a listing, like a parent fallback, may be explored.
+        Applies the same prune rules and duplicate check as list_subdirectories.
+        """
+        directory = normpath(directory)
+        if self.prune_rules is not None and not self.prune_rules.allows_path(directory):
+            return False
+        key = self.identity.key_of(directory) if self.identity is not None else None
+        if self.prune_rules is not None and not self.prune_rules.allows(directory, key):
+            return False
+        return self.identity is None or self.identity.register(directory, key=key)
 
     @staticmethod
-    @lru_cache(maxsize=None)
     def count_files_in_directory(directory):
+        """Number of files in the directory, counted once and shared by every search of the process."""
         directory = normpath(directory)
-        return len([f for f in os.listdir(directory) if os.path.isfile(os.path.join(directory, f))])
+        count = _file_counts.get(directory)
+        if count is None:
+            if _index is not None and directory in _index:
+                count = _index.file_count(directory)
+            else:
+                # The entry types come with the listing, a file needs no stat unless it is a symlink
+                with os.scandir(directory) as entries:
+                    count = sum(1 for entry in entries if _is_file(entry))
+            _file_counts[directory] = count
+        return count
+
+    @staticmethod
+    def forget_count(directory):
+        """Drop the count of a directory that changed, the next count_files_in_directory reads it again."""
+        _file_counts.pop(normpath(directory), None)
+
+    @staticmethod
+    def clear_counts():
+        _file_counts.clear()
+
+    @staticmethod
+    def list_directory(directory):
+        """Names of every entry in the directory, like os.listdir."""
+        directory = normpath(directory)
+        if _index is not None and directory in _index:
+            return list(_index.subdirectories(directory)) + list(_index.files(directory))
+        return os.listdir(directory)
+
+    @staticmethod
+    def list_subdirectories(directory, identity=None, prune_rules=None, mtimes=None, keys=None, files=None):
+        """
+        Full paths of the subdirectories of the directory, in a single scandir pass.
+        With a NodeRegistry the symlink policy is its own and duplicates of known directories are left out.
+        With PruneRules pruned directories are left out, path rules before the stat, device rules after it.
+        A mtimes dict gets the mtime of every live subdirectory from the stat of its entry.
+        A keys dict gets the key of every subdirectory instead of registering it, the registry is left untouched
+        so the listing can run in a thread and the caller registers them in its own order.
+        A files list gets the names of the files of the directory from the same pass.
+        """
+        directory = normpath(directory)
+        if _index is not None and directory in _index:
+            subdirectories = [join(directory, d) for d in _index.subdirectories(directory)]
+            if files is not None:
+                files.extend(_index.files(directory))
+            if identity is None and prune_rules is None:
+                return subdirectories
+            admitted = []
+            for d in subdirectories:
+                if prune_rules is not None and not prune_rules.allows_path(d):
+                    continue
+                key = _index.key(d) if d in _index else None
+                if prune_rules is not None and not prune_rules.allows(d, key):
+                    continue
+                if keys is not None:
+                    keys[d] = key
+                elif identity is not None and not identity.register(d, key=key):
+                    continue
+                admitted.append(d)
+            return admitted
+
+        follow_symlinks = identity.follow_symlinks if identity is not None else True
+        subdirectories = []
+        with os.scandir(directory) as entries:
+            for entry in entries:
+                try:
+                    if not entry.is_dir(follow_symlinks=follow_symlinks):
+                        if files is not None and _is_file(entry):
+                            files.append(entry.name)
+                        continue
+                except OSError:
+                    continue
+                if prune_rules is not None:
+                    if not prune_rules.allows_path(entry.path):
+                        continue
+                    if prune_rules.root_device is not None:
+                        key = None
+                        if identity is not None:
+                            key = identity.key_of(entry.path, entry) if keys is None else identity.read_key(entry.path, entry)
+                        if not prune_rules.allows(entry.path, key):
+                            continue
+                if keys is not None:
+                    keys[entry.path] = identity.read_key(entry.path, entry) if identity is not None else None
+                elif identity is not None and not identity.register(entry.path, entry):
+                    continue
+                if mtimes is not None:
+                    try:
+                        mtimes[entry.path] = entry.stat(follow_symlinks=follow_symlinks).st_mtime
+                    except OSError:
+                        pass
+                subdirectories.append(entry.path)
+        return subdirectories
+
+    @staticmethod
+    def list_files(directory):
+        """Names of the files in the directory."""
+        directory = normpath(directory)
+        if _index is not None and directory in _index:
+            return list(_index.files(directory))
+        return [f for f in os.listdir(directory) if isfile(join(directory, f))]
 
     @staticmethod
     def get_next_directory(directory):
@@ -52,3 +195,24 @@ class FileProcessing:
         except:
             return False
 
+
+def _is_file(entry):
+    """os.path.isfile of a scandir entry, False when it vanished."""
+    try:
+        return entry.is_file()
+    except OSError:
+        return False
+
+
+class NeighborRecord(dict):
+    """
+    Neighbor of get_all_directories_with_file_counts, a dict with "dir_name", "status" and "value".
+    value, the file count of the directory, is counted the first time it is read and kept in the record,
+    so a child that is skipped or blocked before its priority is computed is never listed.
+    Reading it raises PermissionError when the directory cannot be listed.
+    """
+    def __missing__(self, key):
+        if key != "value":
+            raise KeyError(key)
+        value = self["value"] = FileProcessing.count_files_in_directory(self["dir_name"])
+        return value
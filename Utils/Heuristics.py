@@ -0,0 +1,33 @@
+import os
+from os.path import normpath, abspath
+
+
+def path_components(path):
+    """Components of an absolute path, the root is the empty first component."""
+    return tuple(normpath(abspath(path)).rstrip(os.sep).split(os.sep))
+
+
+def tree_distance(components_1, components_2):
+    """Number of parent/child moves between two directories through their lowest common ancestor."""
+    common = 0
+    for part_1, part_2 in zip(components_1, components_2):
+        if part_1 != part_2:
+            break
+        common += 1
+    return len(components_1) + len(components_2) - 2 * common
+
+
+class TreeDistance:
+    """
+    Exact distance from a directory to the closest goal directory.
+    The search space is a tree plus parent edges, so the shortest number of moves goes through the lowest common ancestor.
+    Admissible and consistent whenever every move costs at least 1.
+    """
+    def __init__(self, goals):
+        if isinstance(goals, str):
+            goals = [goals]
+        self.goals = [path_components(goal) for goal in goals]
+
+    def __call__(self, path):
+        components = path_components(path)
+        return min(tree_distance(components, goal) for goal in self.goals)
@@ -0,0 +1,28 @@
+from os.path import normpath, join
+
+from Utils.FileProcessing import FileProcessing
+
+
+def infect_directory(directory, infected_directories, infected_files=None):
+    """
+    Number of files newly infected in directory, 0 when it was infected already.
+    Infection is tracked per directory, its files are counted once from the snapshot, so the memory grows with
+    the directories and not with the files. infected_files, for audits, also records the path of every file
+    and only counts the ones not seen yet.
+    """
+    directory = normpath(directory)
+    if directory in infected_directories:
+        return 0
+    if infected_files is None:
+        count = FileProcessing.count_files_in_directory(directory)
+        infected_directories.add(directory)
+        return count
+
+    count = 0
+    for f in FileProcessing.list_files(directory):
+        file_path = join(directory, f)
+        if file_path not in infected_files:
+            infected_files.add(file_path)
+            count += 1
+    infected_directories.add(directory)
+    return count
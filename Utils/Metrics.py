@@ -3,6 +3,21 @@ from typing import Callable, Any
 import inspect
 from datetime import datetime
 
+# Cache state the current process runs under, see Utils.CacheControl
+cache_mode = "shared"
+
+# When a list, results_in_file appends (algorithm name, text) to it instead of writing, see batch.py
+collected_results = None
+
+def set_cache_mode(mode: str):
+    global cache_mode
+    cache_mode = mode
+
+def collect_results(collector):
+    """Keep the results text in collector instead of writing it, None writes it again."""
+    global collected_results
+    collected_results = collector
+
 def exploitation_rate(infected_files: int,  total_files: int) -> float:
     return (infected_files / total_files) * 100
 
@@ -17,7 +32,7 @@ def reduction_rate(algorithm_1_visited_nodes: int, algorithm_2_visited_nodes: in
 def visit_percent(algorithm_1_visited_nodes: int, total_nodes: int) -> float:
     return (algorithm_1_visited_nodes / total_nodes) * 100
 
-def time_algorithm(algorithm: Callable[..., Any], starting_directory: str = None, seed: int = None) -> list[Any]:
+def time_algorithm(algorithm: Callable[..., Any], starting_directory: str = None, seed: int = None, mode: str = None) -> list[Any]:
 
     # Check function signature to determine the correct arguments
     sig = inspect.signature(algorithm)
@@ -30,9 +45,9 @@ def time_algorithm(algorithm: Callable[..., Any], starting_directory: str = None
     end = time.perf_counter()
     elapsed = end - start
 
-    return [elapsed, results]
+    return [elapsed, results, mode if mode is not None else cache_mode]
 
-def results_in_file(path, path_found, elapsed_time, infected_nodes, infected_files, algo_name, limits):
+def results_in_file(path, path_found, elapsed_time, infected_nodes, infected_files, algo_name, limits, error_rate=None):
     string = f"""
             {limits} Results
 
@@ -44,7 +59,17 @@ def results_in_file(path, path_found, elapsed_time, infected_nodes, infected_fil
             Path Found: {path_found}
             Infected Files: {infected_files}
             Infected Nodes: {infected_nodes}
+            Cache Mode: {cache_mode}
             """
+    if error_rate is not None:
+        # The visited sets were Bloom filters, counts can be short by this chance per lookup
+        string += f"Estimated False Positive Rate: {error_rate}\n"
+    if collected_results is not None:
+        collected_results.append((algo_name, string))
+        return
+    append_results(algo_name, string)
+
+def append_results(algo_name, string):
     try:
         print("Adding Something into the File...")
         with open(algo_name + ".txt", "x") as file:
@@ -55,6 +80,17 @@ def results_in_file(path, path_found, elapsed_time, infected_nodes, infected_fil
 
     print("Done making the File...")
 
+def targets_in_file(report, algo_name):
+    lines = [f"Targets of {algo_name}"]
+    for target, result in report.items():
+        if result is None:
+            lines.append(f"{target}: Not found")
+        else:
+            lines.append(f"{target}: {result['file'] or 'directory'} found in {result['directory']} after {result['time']} seconds, Path: {result['path']}")
+
+    with open(algo_name + ".txt", "a") as file:
+        file.write("\n\n" + "\n".join(lines) + "\n")
+
 
 '''
 Metrics
@@ -0,0 +1,105 @@
+import time
+import queue
+import threading
+from collections import namedtuple
+
+from Utils.Metrics import results_in_file
+
+# Copy of the search state taken when a file limit is crossed, with its path resolved right then so a later
+# reparenting or eviction cannot change it
+Milestone = namedtuple("Milestone", ["limit", "infected_files", "infected_nodes", "node", "target_found", "elapsed",
+                                     "path"])
+
+_STOP = object()
+
+
+class MilestoneRecorder:
+    """
+    Logs a result the first time the infected files cross each file limit.
+    The limits are sorted once so every check is a single comparison against the next threshold.
+    Crossing a limit takes a snapshot with its path, a background writer writes it to the results file.
+    """
+    def __init__(self, file_limit, algo_name, start_time, path_resolver=None, logged_limits=None, background=True):
+        self.thresholds = sorted(set(file_limit or []))
+        self.cursor = 0
+        self.next_threshold = self.thresholds[0] if self.thresholds else float('inf')
+
+        self.algo_name = algo_name
+        self.start_time = start_time
+        self.path_resolver = path_resolver
+        self.logged_limits = logged_limits if logged_limits is not None else []
+        self.snapshots = []
+
+        self.background = background
+        self._queue = queue.Queue()
+        self._writer = None
+
+    def check(self, infected_files, infected_nodes, node, target_found=False):
+        """Record every limit crossed since the last check. Returns True if any was crossed."""
+        if infected_files < self.next_threshold:
+            return False
+
+        elapsed = time.perf_counter() - self.start_time
+        path = self.resolve_path(node)
+        while self.cursor < len(self.thresholds) and infected_files >= self.thresholds[self.cursor]:
+            limit = self.thresholds[self.cursor]
+            self.cursor += 1
+            self.logged_limits.append(limit)
+
+            snapshot = Milestone(limit, infected_files, infected_nodes, node, target_found, elapsed, path)
+            self.snapshots.append(snapshot)
+            print(f"File limit {limit} reached at {infected_files} files")
+
+            if self.background:
+                self._start_writer()
+                self._queue.put(snapshot)
+            else:
+                self.write(snapshot)
+
+        self.next_threshold = self.thresholds[self.cursor] if self.cursor < len(self.thresholds) else float('inf')
+        return True
+
+    def resolve_path(self, node):
+        if self.path_resolver is None or node is None:
+            return None
+        try:
+            return self.path_resolver(node)
+        except (ValueError, KeyError) as e:
+            print(f"Could not resolve the milestone path of {node}: {e}")
+            return "Path not found"
+
+    def write(self, snapshot):
+        results_in_file(
+            snapshot.path,
+            snapshot.target_found,
+            snapshot.elapsed,
+            snapshot.infected_nodes,
+            snapshot.infected_files,
+            self.algo_name,
+            snapshot.limit
+        )
+
+    def _start_writer(self):
+        if self._writer is None:
+            self._writer = threading.Thread(target=self._write_loop, daemon=True)
+            self._writer.start()
+
+    def _write_loop(self):
+        while True:
+            snapshot = self._queue.get()
+            try:
+                if snapshot is _STOP:
+                    return
+                self.write(snapshot)
+            finally:
+                self._queue.task_done()
+
+    def flush(self):
+        """
+        Wait until every milestone is written and stop the writer, call before the search returns.
+        A milestone crossed afterwards starts a new one.
+        """
+        if self._writer is not None:
+            self._queue.put(_STOP)
+            self._writer.join()
+            self._writer = None
@@ -0,0 +1,59 @@
+import os
+from os.path import normpath
+
+
+class NodeRegistry:
+    """
+    Identifies directories by (st_dev, st_ino) instead of their path.
+    A directory reached under a second name, through a symlink, a bind mount or a symlink cycle,
+    is reported as a duplicate so its subtree is only explored once.
+    """
+    def __init__(self, follow_symlinks=True):
+        self.follow_symlinks = follow_symlinks
+        self.keys = {}  # path -> (st_dev, st_ino)
+        self.owners = {}  # (st_dev, st_ino) -> first path it was reached under
+        self.duplicates = 0
+
+    def key_of(self, path, entry=None):
+        """(st_dev, st_ino) of the path, taken from the scandir entry when there is one. None if it cannot be read."""
+        path = normpath(path)
+        key = self.keys.get(path)
+        if key is None:
+            key = self.read_key(path, entry)
+            if key is not None:
+                self.keys[path] = key
+        return key
+
+    def read_key(self, path, entry=None):
+        """key_of without remembering it, so it can be read from another thread."""
+        key = self.keys.get(normpath(path))
+        if key is not None:
+            return key
+        try:
+            if entry is not None:
+                stat = entry.stat(follow_symlinks=self.follow_symlinks)
+            else:
+                stat = os.stat(path, follow_symlinks=self.follow_symlinks)
+        except OSError:
+            return None
+        return stat.st_dev, stat.st_ino
+
+    def register(self, path, entry=None, key=None):
+        """False when the directory is already known under another path."""
+        path = normpath(path)
+        if key is not None:
+            self.keys.setdefault(path, key)
+        else:
+            key = self.key_of(path, entry)
+        if key is None:
+            return True
+
+        owner = self.owners.setdefault(key, path)
+        if owner != path:
+            self.duplicates += 1
+            print(f"{path} is the same directory as {owner}. Skipping this directory.")
+            return False
+        return True
+
+    def is_same(self, path, key):
+        return key is not None and self.key_of(path) == key
@@ -0,0 +1,91 @@
+import os
+import threading
+from collections import OrderedDict
+from os.path import normpath
+
+from Utils.FileProcessing import FileProcessing
+
+try:
+    import numpy as np
+except ImportError:  # The weighted sum is then a plain loop
+    np = None
+
+# Weights of the nutrient of a directory
+FILE_COUNT_WEIGHT = 0.4
+RECENCY_WEIGHT = 0.1
+SIMILARITY_WEIGHT = 0.5
+
+
+class NutrientEngine:
+    """
+    Nutrient of the directories BFO can move to: its file count, its mtime and how much of the target path it shares.
+    The target components are split once, every candidate of a step is scored in one call and the mtimes come from
+    the scandir snapshot of the listing when there is one.
+    Scores are kept in a bounded LRU cache, an entry is recomputed when the directory shows a newer mtime.
+    Safe to call from the sensing threads.
+    """
+    def __init__(self, target_path, capacity=100_000):
+        self.target_parts = normpath(target_path).split(os.sep)
+        self.capacity = capacity
+        self.cache = OrderedDict()  # path -> (nutrient, mtime)
+        self.lock = threading.Lock()
+
+    def similarity(self, path):
+        """Share of the target components the path starts with, weighted down by half."""
+        common_depth = 0
+        for t, c in zip(self.target_parts, path.split(os.sep)):
+            if t != c:
+                break
+            common_depth += 1
+        return common_depth / len(self.target_parts) * 0.5
+
+    def score(self, paths, mtimes=None):
+        """
+        Nutrient of every path, None for the ones that cannot be read.
+        mtimes maps a path to the mtime already read by its listing, the others are stat'ed.
+        """
+        mtimes = mtimes or {}
+        scores = [None] * len(paths)
+        missing = []  # (index, path, mtime) to compute
+        with self.lock:
+            for i, path in enumerate(paths):
+                cached = self.cache.get(path)
+                mtime = mtimes.get(path)
+                if cached is not None and (mtime is None or mtime <= cached[1]):
+                    self.cache.move_to_end(path)
+                    scores[i] = cached[0]
+                else:
+                    missing.append((i, path, mtime, cached is not None))
+
+        computed = []
+        for i, path, mtime, stale in missing:
+            try:
+                if mtime is None:
+                    mtime = os.path.getmtime(path)
+                # A changed directory is recounted, and the shared count the searches read is refreshed with it
+                if stale:
+                    FileProcessing.forget_count(path)
+                count = FileProcessing.count_files_in_directory(path)
+            except OSError:
+                continue
+            computed.append((i, path, mtime, count, self.similarity(path)))
+
+        if np is not None and computed:
+            values = np.array([entry[2:] for entry in computed], dtype=np.float64)
+            nutrients = (values[:, 1] * FILE_COUNT_WEIGHT + values[:, 0] * RECENCY_WEIGHT
+                         + values[:, 2] * SIMILARITY_WEIGHT).tolist()
+        else:
+            nutrients = [count * FILE_COUNT_WEIGHT + mtime * RECENCY_WEIGHT + similarity * SIMILARITY_WEIGHT
+                         for _, _, mtime, count, similarity in computed]
+
+        with self.lock:
+            for (i, path, mtime, _, _), nutrient in zip(computed, nutrients):
+                scores[i] = nutrient
+                self.cache[path] = (nutrient, mtime)
+                self.cache.move_to_end(path)
+            while len(self.cache) > self.capacity:
+                self.cache.popitem(last=False)
+        return scores
+
+    def __len__(self):
+        return len(self.cache)
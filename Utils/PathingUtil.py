@@ -42,9 +42,13 @@ def _reconstruct_path_generator(parent_map, start, end):
     if start not in parent_map or end not in parent_map:
         raise ValueError("Start or end node not in parent_map.")
     current = end
+    steps = 0
     while current != start:
         yield current
         current = parent_map[current]
+        steps += 1
+        if steps > len(parent_map):
+            raise ValueError("Cycle in parent_map. Path reconstruction failed.")
     yield start
 
 
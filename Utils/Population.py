@@ -0,0 +1,175 @@
+from array import array
+
+try:
+    import numpy as np
+except ImportError:  # The stdlib arrays do the same work in plain loops
+    np = None
+
+
+class Population:
+    """
+    Structure-of-arrays bacteria population of BacterialForaging.
+    Bacterium i is position[i], the id of its directory, health[i], depth[i] and tip[i], the end of its path.
+    Paths are parent pointers into one shared trail table, a clone points at the trail of its parent instead of
+    copying a path list, and directories are interned once in nodes.
+    NumPy arrays are used when it is installed, the health update and the selection are then vectorized.
+    """
+    def __init__(self, size, start):
+        self.nodes = []  # id -> directory
+        self.ids = {}  # directory -> id
+        self.trail_node = array("q")  # Trail entry -> node id
+        self.trail_parent = array("q")  # Trail entry -> previous entry of the path, -1 at its start
+
+        start_id = self.node_id(start)
+        root = self.extend(-1, start_id)
+        self.position = self._array("q", [start_id] * size)
+        self.health = self._array("d", [100.0] * size)
+        self.depth = self._array("q", [0] * size)
+        self.tip = self._array("q", [root] * size)
+
+    @staticmethod
+    def _array(typecode, values):
+        if np is not None:
+            return np.array(values, dtype=np.float64 if typecode == "d" else np.int64)
+        return array(typecode, values)
+
+    def __len__(self):
+        return len(self.position)
+
+    def node_id(self, directory):
+        node = self.ids.get(directory)
+        if node is None:
+            node = self.ids[directory] = len(self.nodes)
+            self.nodes.append(directory)
+        return node
+
+    def extend(self, parent, node):
+        """Add a trail entry after parent and return its index."""
+        self.trail_node.append(node)
+        self.trail_parent.append(parent)
+        return len(self.trail_node) - 1
+
+    def position_of(self, i):
+        return self.nodes[self.position[i]]
+
+    def path(self, i):
+        """Walked path of bacterium i, from where it started to its tip."""
+        path = []
+        entry = int(self.tip[i])
+        while entry != -1:
+            path.append(self.nodes[self.trail_node[entry]])
+            entry = self.trail_parent[entry]
+        path.reverse()
+        return path
+
+    def move(self, i, directory):
+        node = self.node_id(directory)
+        self.tip[i] = self.extend(int(self.tip[i]), node)
+        self.position[i] = node
+        self.depth[i] += 1
+
+    def settle(self, i, entry, depth):
+        """Put bacterium i at the end of an existing trail entry, with full health."""
+        self.tip[i] = entry
+        self.position[i] = self.trail_node[entry]
+        self.depth[i] = depth
+        self.health[i] = 100
+
+    def place(self, i, path):
+        """Put bacterium i at the end of path, with full health."""
+        entry = -1
+        for directory in path:
+            entry = self.extend(entry, self.node_id(directory))
+        self.tip[i] = entry
+        self.position[i] = self.trail_node[entry]
+        self.depth[i] = len(path) - 1
+        self.health[i] = 100
+
+    def feed(self, nutrients):
+        """
+        Grow the health of every bacterium by a tenth of the nutrient of its directory, up to 100,
+        or take 5 where there is none. True when a bacterium died.
+        """
+        if np is not None:
+            nutrients = np.asarray(nutrients, dtype=np.float64)
+            self.health = np.where(nutrients > 0, np.minimum(100, self.health + nutrients * 0.1), self.health - 5)
+            return bool((self.health <= 0).any())
+
+        died = False
+        for i, nutrient in enumerate(nutrients):
+            if nutrient > 0:
+                self.health[i] = min(100, self.health[i] + nutrient * 0.1)
+            else:
+                self.health[i] -= 5
+            died = died or self.health[i] <= 0
+        return died
+
+    def reproduce(self, neighbor_of):
+        """
+        The healthier half splits in two clones with full health, one stays and one moves to neighbor_of its
+        directory. Both keep the trail of their parent.
+        """
+        size = len(self)
+        if np is not None:
+            order = np.argsort(-self.health, kind="stable")
+        else:
+            order = sorted(range(size), key=lambda i: -self.health[i])
+        top = [int(i) for i in order[:max(1, size // 2)]]
+
+        position, depth, tip = [], [], []
+        for i in top:
+            moved = self.node_id(neighbor_of(self.nodes[self.position[i]]))
+            position += [int(self.position[i]), moved]
+            depth += [int(self.depth[i])] * 2
+            tip += [int(self.tip[i])] * 2
+
+        self.position = self._array("q", position)
+        self.depth = self._array("q", depth)
+        self.tip = self._array("q", tip)
+        self.health = self._array("d", [100.0] * len(position))
+
+
+class PositionIndex:
+    """
+    Directories the bacteria reached, sampled in O(1) by elimination_dispersal.
+    Each keeps the trail entry and depth of the first bacterium that got there, a dispersed bacterium takes them over
+    instead of rebuilding its path. Blocked directories are dropped lazily when they are drawn, the sensing threads
+    can block one at any time.
+    """
+    def __init__(self):
+        self.directories = []
+        self.slots = {}  # directory -> index in directories
+        self.trails = {}  # directory -> (trail entry, depth)
+
+    def __len__(self):
+        return len(self.directories)
+
+    def __contains__(self, directory):
+        return directory in self.slots
+
+    def add(self, directory, entry, depth):
+        if directory in self.slots:
+            return
+        self.slots[directory] = len(self.directories)
+        self.directories.append(directory)
+        self.trails[directory] = (entry, depth)
+
+    def discard(self, directory):
+        """Swap the last directory into its slot."""
+        slot = self.slots.pop(directory, None)
+        if slot is None:
+            return
+        last = self.directories.pop()
+        if last != directory:
+            self.directories[slot] = last
+            self.slots[last] = slot
+        del self.trails[directory]
+
+    def sample(self, rng, blocked=()):
+        """A random directory that is not blocked, None when none is left."""
+        while self.directories:
+            directory = self.directories[int(rng.random() * len(self.directories))]
+            if directory not in blocked:
+                return directory
+            self.discard(directory)
+        return None
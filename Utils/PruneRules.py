@@ -0,0 +1,101 @@
+import os
+import re
+import fnmatch
+from functools import lru_cache
+from os.path import normpath, abspath
+
+# Filesystems that only expose kernel state, nothing worth infecting lives there
+PSEUDO_FILESYSTEMS = frozenset({
+    "proc", "sysfs", "devtmpfs", "devpts", "cgroup", "cgroup2", "securityfs", "debugfs", "tracefs", "pstore",
+    "bpf", "configfs", "fusectl", "mqueue", "hugetlbfs", "autofs", "binfmt_misc", "efivarfs", "rpc_pipefs", "nsfs"
+})
+
+
+def _unescape_mount_point(mount_point):
+    # Spaces, tabs and backslashes are octal escaped in mountinfo
+    return re.sub(r"\\([0-7]{3})", lambda m: chr(int(m.group(1), 8)), mount_point)
+
+
+@lru_cache(maxsize=None)
+def read_mountinfo(path="/proc/self/mountinfo"):
+    """(mount point, filesystem type) of every mount, empty where mountinfo does not exist."""
+    mounts = []
+    try:
+        with open(path) as file:
+            for line in file:
+                fields = line.split()
+                if "-" not in fields:
+                    continue
+                separator = fields.index("-")
+                mounts.append((_unescape_mount_point(fields[4]), fields[separator + 1]))
+    except OSError:
+        pass
+    return tuple(mounts)
+
+
+def _depth(path):
+    return len(path.rstrip(os.sep).split(os.sep))
+
+
+class PruneRules:
+    """
+    Directories that are never listed, compiled once and checked before a child is listed.
+    > prefixes: directories pruned with their whole subtree
+    > globs: a glob without a separator matches the directory name, "node_modules", otherwise the full path
+    > fs_types: mount points of these filesystem types, from /proc/self/mountinfo, are added to the prefixes
+    > one_file_system: directories on another device than the root are pruned
+    > max_depth: directories more than max_depth levels below the depth of the root are pruned. The limit is a
+      level and not a distance: a search that climbs k levels above the root and goes down another branch may go
+      max_depth + k levels below the ancestor it climbed to
+    Rules that would prune the root itself are dropped so starting inside one still works.
+    """
+    def __init__(self, root, prefixes=(), globs=(), fs_types=PSEUDO_FILESYSTEMS, one_file_system=False, max_depth=None):
+        self.root = normpath(abspath(root))
+        self.root_depth = _depth(self.root)
+
+        candidates = {normpath(abspath(p)) for p in prefixes}
+        candidates.update(mount_point for mount_point, fs_type in read_mountinfo() if fs_type in (fs_types or ()))
+        self.prefixes = frozenset(p for p in candidates
+                                  if p != self.root and not self.root.startswith(p.rstrip(os.sep) + os.sep))
+
+        name_globs = [g for g in globs if os.sep not in g]
+        path_globs = [g for g in globs if os.sep in g]
+        self.name_pattern = re.compile("|".join(fnmatch.translate(g) for g in name_globs)) if name_globs else None
+        self.path_pattern = re.compile("|".join(fnmatch.translate(g) for g in path_globs)) if path_globs else None
+
+        self.max_depth = max_depth
+        self.root_device = None
+        if one_file_system:
+            try:
+                self.root_device = os.stat(self.root).st_dev
+            except OSError:
+                pass
+
+    def allows_path(self, path):
+        """Every rule that only needs the path. Ancestors are not checked, a pruned directory is never listed."""
+        if path in self.prefixes:
+            return False
+        if self.max_depth is not None and _depth(path) - self.root_depth > self.max_depth:
+            return False
+        if self.name_pattern is not None and self.name_pattern.match(os.path.basename(path)):
+            return False
+        if self.path_pattern is not None and self.path_pattern.match(path):
+            return False
+        return True
+
+    def allows_device(self, key):
+        """key is the (st_dev, st_ino) of the directory, see NodeRegistry."""
+        if self.root_device is None or key is None:
+            return True
+        return key[0] == self.root_device
+
+    def allows(self, path, key=None):
+        path = normpath(path)
+        if not self.allows_path(path):
+            return False
+        if self.root_device is not None and key is None:
+            try:
+                key = (os.stat(path).st_dev, 0)
+            except OSError:
+                return True
+        return self.allows_device(key)
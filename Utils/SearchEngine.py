@@ -0,0 +1,390 @@
+import heapq
+import time
+from os.path import normpath, dirname
+
+from Utils.FileProcessing import FileProcessing
+from Utils.PathingUtil import reconstruct_path
+from Utils.Metrics import results_in_file
+from Utils.Anytime import Deadline, search_result
+from Utils.SpillFrontier import SpillFrontier
+from Utils.BloomFilter import estimated_error
+
+
+class Frontier:
+    """
+    Binary heap of (priority, counter, node), the counter keeps insertion order among equal priorities.
+    keyed: a node is in the frontier once, pushing it again replaces its priority and the old entry is skipped when popped.
+    Otherwise every push is popped, like a plain heapq.
+    """
+    def __init__(self, keyed=True):
+        self.heap = []
+        self.keyed = keyed
+        self.entries = {}  # node -> (priority, counter) of its live entry
+        self.counter = 0
+
+    def push(self, node, priority):
+        entry = (priority, self.counter, node)
+        self.counter += 1
+        if self.keyed:
+            self.entries[node] = entry[:2]
+        heapq.heappush(self.heap, entry)
+
+    def pop(self):
+        """(priority, node) of the lowest live entry."""
+        while self.heap:
+            priority, counter, node = heapq.heappop(self.heap)
+            if self.keyed:
+                if self.entries.get(node) != (priority, counter):
+                    continue
+                del self.entries[node]
+            return priority, node
+        raise IndexError("pop from an empty frontier")
+
+    def peek(self):
+        """(priority, node) of the lowest live entry, left in the frontier."""
+        while self.heap:
+            priority, counter, node = self.heap[0]
+            if not self.keyed or self.entries.get(node) == (priority, counter):
+                return priority, node
+            heapq.heappop(self.heap)
+        raise IndexError("peek at an empty frontier")
+
+    def evict(self, count, keep=(), above=None):
+        """
+        Remove the count worst live entries, except the nodes in keep and the priorities up to above,
+        and return them as (node, priority).
+        Keyed frontiers only, the heap is rebuilt from the live entries so the stale ones are dropped as well.
+        """
+        candidates = ((node, entry) for node, entry in self.entries.items()
+                      if node not in keep and (above is None or entry[0] > above))
+        worst = heapq.nlargest(count, candidates, key=lambda item: item[1])
+        for node, _ in worst:
+            del self.entries[node]
+        self.rebuild()
+        return [(node, priority) for node, (priority, _) in worst]
+
+    def rebuild(self):
+        """Heap of the live entries only, after entries was changed or restored directly."""
+        self.heap = [(priority, counter, node) for node, (priority, counter) in self.entries.items()]
+        heapq.heapify(self.heap)
+
+    def __len__(self):
+        return len(self.entries) if self.keyed else len(self.heap)
+
+    def __contains__(self, node):
+        if self.keyed:
+            return node in self.entries
+        return any(entry[2] == node for entry in self.heap)
+
+
+def make_frontier(spill_limit=None):
+    """The keyed in-memory Frontier, or a SpillFrontier keeping spill_limit entries in memory."""
+    if spill_limit:
+        return SpillFrontier(spill_limit)
+    return Frontier(keyed=True)
+
+
+class SearchPolicy:
+    """Defaults of the hooks best_first_search calls, an algorithm overrides the ones it needs."""
+    # Meet a backward climb from ending_path, see BackwardClimb
+    bidirectional = False
+    # path_to lists the node first and climbs back to the start, unless this is set
+    path_from_start = False
+    # Set while a reopened parent is expanded again, its files and children were already counted
+    regenerating = False
+
+    def start(self, node):
+        self.parent_map[node] = node
+        return 0, 0
+
+    def on_pop(self, node):
+        pass
+
+    def visit(self, node):
+        return True
+
+    def reached_goal(self, node):
+        return False
+
+    def close(self, node):
+        pass
+
+    def expand(self, node, found_targets):
+        return self.file_processing.get_all_directories_with_file_counts(node)
+
+    def skip(self, node, child):
+        return False
+
+    def on_child(self, node, child, entry, improved):
+        if improved:
+            self.parent_map[child] = node
+
+    def priority(self, child, cost):
+        return cost
+
+    def may_climb(self, node, parent):
+        return True
+
+    def reopen(self, node):
+        """Forget that node was expanded, so it is expanded again and regenerates its evicted children"""
+        pass
+
+    def path_to(self, node):
+        return reconstruct_path(self.parent_map, self.starting_node, node)
+
+    def count_node(self):
+        """Count an infected directory, unless it is only regenerated."""
+        if not self.regenerating:
+            self.infected_nodes += 1
+
+
+class BackwardClimb:
+    """
+    Backward frontier of a bidirectional search towards its known target directory.
+    It climbs from the target with dirname, a parent edge needs no listing, one directory per forward expansion,
+    until the root or a directory the prune rules refuse. The forward search meets it on any ancestor of the target.
+    """
+    def __init__(self, target, admit):
+        self.target = normpath(target)
+        self.children = {self.target: None}  # directory -> the next one down to the target
+        self.tip = self.target
+        self.admit = admit
+        self.done = False
+
+    def step(self):
+        if self.done:
+            return
+        parent = normpath(dirname(self.tip))
+        if parent == self.tip or not self.admit(parent):
+            self.done = True
+            return
+        self.children[parent] = self.tip
+        self.tip = parent
+
+    def __contains__(self, node):
+        return node in self.children
+
+    def descend(self, node):
+        """Directories below node down to the target."""
+        path = []
+        node = self.children[node]
+        while node is not None:
+            path.append(node)
+            node = self.children[node]
+        return path
+
+
+def meet(algorithm, backward, node):
+    """
+    The forward search reached the backward climb at node, return the path through it to the target directory,
+    in the order path_to gives, and check the targets there.
+    """
+    path = algorithm.path_to(node)
+    down = backward.descend(node)
+    path = path + down if algorithm.path_from_start else list(reversed(down)) + path
+    print(f"Forward and backward searches met at {node}")
+
+    try:
+        found_targets = algorithm.targets.check(backward.target, path_resolver=lambda: path)
+    except (PermissionError, FileNotFoundError):
+        print(f"Access denied to {backward.target}; Skipping...")
+        found_targets = []
+    if found_targets:
+        print(f"Found target file: {', '.join(found_targets)} in {backward.target}")
+        algorithm.target_found = True
+    return path
+
+
+def finish(algorithm, node, write=True, path=None):
+    """Flush the milestones, write the results file and return the result of a search ending at node."""
+    path = algorithm.path_to(node) if path is None else path
+    algorithm.milestones.flush()
+    if algorithm.checkpoint is not None:
+        algorithm.checkpoint.close()
+    if write:
+        results_in_file(
+            path,
+            algorithm.target_found,
+            time.perf_counter() - algorithm.start_time,
+            algorithm.infected_nodes,
+            algorithm.infected_files,
+            algorithm.result_name,
+            algorithm.file_limit,
+            error_rate=estimated_error(algorithm)
+        )
+    return search_result(path, algorithm.target_found, algorithm.start_time,
+                         algorithm.infected_nodes, algorithm.infected_files)
+
+
+def relax(algorithm, node, child):
+    """
+    Offer a child to the frontier through the cost and priority policies.
+    Its files are only counted if the policies read the value of its record, they are charged when it is expanded.
+    """
+    dir_name = normpath(child["dir_name"])
+    if algorithm.skip(node, dir_name):
+        return
+
+    try:
+        cost = algorithm.cost(node, child)
+    except (PermissionError, FileNotFoundError):
+        print(f"Access denied to {dir_name}; Skipping...")
+        return
+    improved = dir_name not in algorithm.costs or cost < algorithm.costs[dir_name]
+    algorithm.on_child(node, dir_name, child, improved)
+    if improved:
+        algorithm.costs[dir_name] = cost
+        priority = algorithm.priority(dir_name, cost)
+        if priority is not None:
+            algorithm.frontier.push(dir_name, priority)
+
+
+def bound_memory(algorithm, priority):
+    """
+    SMA* style memory bound, once the frontier holds more than node_budget entries the worst ones are evicted
+    down to nine tenths of the budget. Their parent_map and cost entries are dropped, the lowest priority is backed
+    up into their parent in forgotten and the parent is reopened with it, it regenerates them when popped again.
+    Reopened parents are not evicted themselves, the path to their expanded children goes through them.
+    Entries no worse than the priority just popped are kept too, a regenerated child would otherwise be evicted
+    again and its parent reopened forever.
+    A reopened parent is forgotten from the visited set, the budget needs an exact one and not a Bloom filter.
+    The file counts of the evicted nodes are dropped as well, they are read again if regenerated.
+    Only the open list is bounded: the visited set, the parent_map entries of expanded directories, the identity
+    registry, the blocked directories and an installed directory index keep growing with the directories expanded.
+    """
+    budget = algorithm.node_budget
+    frontier = algorithm.frontier
+    # A spilled frontier is already bounded in memory and cannot evict by key
+    if not budget or not frontier.keyed or len(frontier) <= budget:
+        return
+
+    evicted = frontier.evict(len(frontier) - budget * 9 // 10, keep=algorithm.forgotten, above=priority)
+    for node, priority in evicted:
+        algorithm.costs.pop(node, None)
+        FileProcessing.forget_count(node)
+        parent = algorithm.parent_map.pop(node, None)
+        if parent is None or parent == node or parent not in algorithm.costs:
+            continue
+        algorithm.forgotten[parent] = min(priority, algorithm.forgotten.get(parent, priority))
+
+    reopened = 0
+    for parent, priority in algorithm.forgotten.items():
+        if parent not in frontier:
+            algorithm.reopen(parent)
+            frontier.push(parent, priority)
+            reopened += 1
+    print(f"Node budget of {budget} reached, evicted {len(evicted)} directories and reopened {reopened} parents")
+
+
+def best_first_search(algorithm):
+    """
+    The search loop shared by the best-first algorithms, as an anytime generator returning the result.
+    The algorithm is the policy, next to its frontier, costs, parent_map, counters and result_name it provides:
+    > start(node): parent entry of the start node, its cost and priority
+    > on_pop(node), visit(node) False skips a popped node, reached_goal(node), close(node)
+    > expand(node, found_targets): the children with their file counts
+    > skip(node, child), cost(node, entry), on_child(node, child, entry, improved), priority(child, cost) None keeps it out
+    > may_climb(node, parent), climb(node, parent): the parent directory fallback
+    > path_to(node)
+    > node_budget None or the most frontier entries kept, forgotten and reopen(node), see bound_memory.
+    regenerating is set while a reopened parent is expanded again, count_node() and the files are not counted twice
+    > checkpoint None or a Checkpoint saved between two expansions. A search restored from one has costs already
+    and goes on with its frontier instead of starting over
+    > bidirectional: a BackwardClimb from ending_path is met by the popped, generated or climbed directories,
+    the search stops there when it finds every target in ending_path
+    EBS and BFO keep their own loops. EBS alternates two frontiers, each with its own g-scores, parents and meeting
+    test, where this loop pops one. BFO moves a population of bacteria by chemotaxis, it has no frontier to pop.
+    """
+    if algorithm.node_budget and estimated_error(algorithm) is not None:
+        raise ValueError("a node budget reopens expanded directories, it cannot be used with Bloom filter visited sets")
+    if algorithm.deadline is None:
+        algorithm.deadline = Deadline(algorithm.start_time, algorithm.run_time_min * 60)
+    deadline = algorithm.deadline
+    frontier = algorithm.frontier
+    targets = algorithm.targets
+    backward = BackwardClimb(algorithm.ending_path, algorithm.file_processing.admit) if algorithm.bidirectional else None
+
+    node = algorithm.starting_node
+    if not algorithm.costs:
+        cost, priority = algorithm.start(node)
+        algorithm.costs[node] = cost
+        frontier.push(node, priority)
+
+    while frontier:
+        # Saved before the pop, the next directory to expand is still in the frontier
+        if algorithm.checkpoint is not None:
+            algorithm.checkpoint.tick(algorithm)
+
+        priority, node = frontier.pop()
+        algorithm.regenerating = algorithm.forgotten.pop(node, None) is not None
+        algorithm.on_pop(node)
+
+        if deadline.expired():
+            print("Time limit reached. Stopping the process.")
+            return finish(algorithm, node)
+
+        algorithm.milestones.check(algorithm.infected_files, algorithm.infected_nodes, node, algorithm.target_found)
+        if algorithm.progress.due(node):
+            yield algorithm.progress.snapshot(algorithm, algorithm.path_to, len(frontier))
+
+        if backward is not None:
+            backward.step()
+            if node in backward:
+                path = meet(algorithm, backward, node)
+                backward = None  # Met once, ending_path is resolved
+                if targets.done:
+                    return finish(algorithm, node, path=path)
+
+        if not algorithm.visit(node):
+            continue
+
+        try:
+            if algorithm.reached_goal(node):
+                algorithm.target_found = True
+                return finish(algorithm, node)
+
+            # One listing gives the file names, the file count and the children expanded below
+            found_targets = targets.check(node, algorithm.file_processing.scan(node), lambda: algorithm.path_to(node))
+            if found_targets:
+                print(f"Found target file: {', '.join(found_targets)} in {node}")
+                algorithm.target_found = True
+
+            # The files of a directory are infected when it is expanded
+            if not algorithm.regenerating:
+                algorithm.infected_files += FileProcessing.count_files_in_directory(node)
+
+            if targets.done:
+                return finish(algorithm, node)
+        except (PermissionError, FileNotFoundError):
+            print(f"Access denied to {node}; Skipping...")
+            continue
+
+        algorithm.close(node)
+
+        try:
+            children = algorithm.expand(node, found_targets)
+        except PermissionError:
+            print(f"Access denied to {node}; Skipping...")
+            continue
+
+        for child in children:
+            relax(algorithm, node, child)
+
+        parent = normpath(dirname(node))
+        if parent != node and algorithm.may_climb(node, parent) and algorithm.file_processing.admit(parent):
+            algorithm.climb(node, parent)
+
+        if backward is not None:
+            # Met as soon as a reached child or the climbed parent is on the backward climb
+            reached = [normpath(child["dir_name"]) for child in children] + [parent]
+            met = next((d for d in reached if d in backward and d in algorithm.parent_map), None)
+            if met is not None:
+                path = meet(algorithm, backward, met)
+                backward = None
+                if targets.done:
+                    return finish(algorithm, met, path=path)
+
+        bound_memory(algorithm, priority)
+
+    # The frontier ran dry, only the milestones are written
+    return finish(algorithm, node, write=False)
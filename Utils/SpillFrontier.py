@@ -0,0 +1,143 @@
+import os
+import heapq
+import mmap
+import struct
+import tempfile
+
+# Record of a spilled entry: priority, counter, length of the utf-8 path, then the path
+_RECORD = struct.Struct("<dqI")
+
+
+class _Run:
+    """A sorted run of entries in a memory-mapped file, read front to back."""
+    def __init__(self, path, count):
+        self.path = path
+        self.count = count
+        self.file = open(path, "rb")
+        self.map = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+        self.offset = 0
+
+    def next(self):
+        """(priority, counter, node) of the next entry, None once the run is exhausted."""
+        if self.count == 0:
+            self.close()
+            return None
+        priority, counter, size = _RECORD.unpack_from(self.map, self.offset)
+        start = self.offset + _RECORD.size
+        self.offset = start + size
+        self.count -= 1
+        return priority, counter, self.map[start:self.offset].decode("utf-8", "surrogateescape")
+
+    def entries(self, first):
+        """first, the entry already read, and every entry after it. The run is closed once they are consumed."""
+        entry = first
+        while entry is not None:
+            yield entry
+            entry = self.next()
+
+    def close(self):
+        if self.map is not None:
+            self.map.close()
+            self.file.close()
+            os.remove(self.path)
+            self.map = None
+
+
+class SpillFrontier:
+    """
+    External-memory priority queue, a drop-in for an unkeyed Frontier when the open set outgrows the RAM.
+    At most memory_limit entries stay in the in-memory heap. Past it the heap is sorted and its worse half is
+    written as a sorted run to a memory-mapped file, the runs are merged back lazily on pop through a heap of
+    their first entries. The (priority, counter) order is the same as the in-memory Frontier.
+    A node can be in it more than once, like an unkeyed Frontier, the policies skip the ones already expanded.
+    Membership only knows the nodes still in memory, a climb offered again for a spilled node becomes a duplicate.
+    At most fan_in runs are open, past it the smallest ones are merged into a single run and their files closed.
+    """
+    keyed = False
+
+    def __init__(self, memory_limit=100_000, directory=None, fan_in=16):
+        self.memory_limit = max(2, memory_limit)
+        self.fan_in = max(2, fan_in)
+        self.heap = []
+        self.in_memory = {}  # node -> number of its entries in the heap
+        self.counter = 0
+        self.heads = []  # (priority, counter, node, run) of the first unread entry of each run
+        self.spilled = 0
+        self.runs = 0
+        self.directory = tempfile.TemporaryDirectory(prefix="frontier_", dir=directory)
+
+    def push(self, node, priority):
+        heapq.heappush(self.heap, (priority, self.counter, node))
+        self.counter += 1
+        self.in_memory[node] = self.in_memory.get(node, 0) + 1
+        if len(self.heap) > self.memory_limit:
+            self.spill()
+
+    def spill(self):
+        """Write the worse half of the heap as a sorted run."""
+        self.heap.sort()
+        keep = len(self.heap) // 2
+        run_entries = self.heap[keep:]
+        del self.heap[keep:]  # A sorted list is a valid heap
+
+        for _, _, node in run_entries:
+            self._forget(node)
+        run = self._write_run(run_entries)
+        heapq.heappush(self.heads, (*run.next(), run))
+        self.spilled += len(run_entries)
+        print(f"Frontier spilled {len(run_entries)} entries to {run.path}")
+
+        if len(self.heads) > self.fan_in:
+            self.merge()
+
+    def merge(self):
+        """k-way merge the fan_in smallest runs into one, the larger ones are left for a later merge."""
+        self.heads.sort(key=lambda head: head[3].count)
+        merged, self.heads = self.heads[:self.fan_in], self.heads[self.fan_in:]
+        heapq.heapify(self.heads)
+
+        run = self._write_run(heapq.merge(*(run.entries(tuple(head)) for *head, run in merged)))
+        heapq.heappush(self.heads, (*run.next(), run))
+        print(f"Frontier merged {len(merged)} runs into {run.path}")
+
+    def _write_run(self, entries):
+        """Write sorted (priority, counter, node) entries to a new run file and open it."""
+        path = os.path.join(self.directory.name, f"run_{self.runs}.bin")
+        self.runs += 1
+        count = 0
+        with open(path, "wb") as f:
+            for priority, counter, node in entries:
+                encoded = node.encode("utf-8", "surrogateescape")
+                f.write(_RECORD.pack(priority, counter, len(encoded)))
+                f.write(encoded)
+                count += 1
+        return _Run(path, count)
+
+    def _forget(self, node):
+        count = self.in_memory[node] - 1
+        if count:
+            self.in_memory[node] = count
+        else:
+            del self.in_memory[node]
+
+    def pop(self):
+        """(priority, node) of the lowest entry, in memory or at the head of a run."""
+        if self.heads and (not self.heap or self.heads[0][:2] < self.heap[0][:2]):
+            priority, counter, node, run = heapq.heappop(self.heads)
+            following = run.next()
+            if following is not None:
+                heapq.heappush(self.heads, (*following, run))
+            self.spilled -= 1
+            return priority, node
+
+        if not self.heap:
+            raise IndexError("pop from an empty frontier")
+        priority, _, node = heapq.heappop(self.heap)
+        self._forget(node)
+        return priority, node
+
+    def __len__(self):
+        return len(self.heap) + self.spilled
+
+    def __contains__(self, node):
+        return node in self.in_memory
@@ -0,0 +1,89 @@
+import re
+import fnmatch
+
+REGEX_PREFIX = "re:"
+_GLOB_CHARACTERS = re.compile(r"[*?\[]")
+_EXTENSION_ONLY = re.compile(r"^\*(\.[^*?\[\].]+)$")
+
+
+def is_pattern(target):
+    return target.startswith(REGEX_PREFIX) or _GLOB_CHARACTERS.search(target) is not None
+
+
+class TargetMatcher:
+    """
+    Target file names compiled once into a single matcher.
+    > literal names, "secret.kdbx", are a set lookup
+    > extension only globs, "*.kdbx", are a set lookup on the last extension
+    > every other glob, "id_rsa*", is combined into one regex
+    > regexes, "re:^backup_\\d+\\.zip$", are compiled on their own, their groups, backreferences and inline
+    flags stay as written
+    Globs and regexes have to match the whole name.
+    """
+    def __init__(self, targets):
+        self.targets = list(dict.fromkeys(targets))
+        self.literals = set()
+        self.extensions = {}  # ".kdbx" -> "*.kdbx"
+        self.patterns = {}  # group name -> (target, compiled glob)
+        self.regexes = []  # (target, compiled regex)
+
+        for target in self.targets:
+            if not is_pattern(target):
+                self.literals.add(target)
+                continue
+
+            extension = _EXTENSION_ONLY.match(target)
+            if extension:
+                self.extensions[extension.group(1)] = target
+                continue
+
+            if target.startswith(REGEX_PREFIX):
+                self.regexes.append((target, re.compile(target[len(REGEX_PREFIX):])))
+            else:
+                self.patterns[f"t{len(self.patterns)}"] = (target, re.compile(fnmatch.translate(target)))
+
+        self.combined = None
+        if self.patterns:
+            self.combined = re.compile("|".join(f"(?P<{group}>{compiled.pattern})"
+                                                for group, (_, compiled) in self.patterns.items()))
+
+    @property
+    def literal_only(self):
+        return not self.extensions and not self.patterns and not self.regexes
+
+    def match(self, name):
+        """Every target the name satisfies."""
+        matched = []
+        if name in self.literals:
+            matched.append(name)
+
+        if self.extensions:
+            dot = name.rfind(".")
+            if dot != -1 and name[dot:] in self.extensions:
+                matched.append(self.extensions[name[dot:]])
+
+        if self.combined is not None and self.combined.match(name):
+            # The combined regex only tells that one pattern matched, check the others on a hit
+            matched.extend(target for target, compiled in self.patterns.values() if compiled.match(name))
+
+        matched.extend(target for target, compiled in self.regexes if compiled.fullmatch(name))
+        return matched
+
+    def scan(self, names, wanted):
+        """
+        First name that satisfies each wanted target, in a single pass over names.
+        Returns target -> matched name.
+        """
+        if self.literal_only:
+            return {name: name for name in wanted.intersection(names)}
+
+        wanted = set(wanted)
+        hits = {}
+        for name in names:
+            for target in self.match(name):
+                if target in wanted:
+                    hits[target] = name
+                    wanted.discard(target)
+            if not wanted:
+                break
+        return hits
@@ -0,0 +1,74 @@
+import time
+from os.path import normpath, abspath, join, isfile
+
+from Utils.FileProcessing import FileProcessing
+from Utils.TargetMatcher import TargetMatcher
+
+
+class TargetSet:
+    """
+    Every target a single traversal has to find.
+    Target files are matched by name inside the expanded directories, target directories by their path.
+    A target file can also be a glob, "*.kdbx", or a regex prefixed with "re:", see TargetMatcher.
+    The search keeps going until every target is found or its budget runs out.
+    """
+    def __init__(self, target_files, target_dirs=None, start_time=None):
+        if isinstance(target_files, str):
+            target_files = [target_files]
+
+        self.target_files = list(dict.fromkeys(target_files or []))
+        self.target_dirs = list(dict.fromkeys(normpath(abspath(d)) for d in target_dirs or []))
+
+        self.matcher = TargetMatcher(self.target_files)
+        self.pending_files = set(self.target_files)
+        self.pending_dirs = set(self.target_dirs)
+
+        # target -> {"directory", "file", "path", "time"}
+        self.found = {}
+        self.start_time = start_time if start_time is not None else time.perf_counter()
+
+    def __len__(self):
+        return len(self.target_files) + len(self.target_dirs)
+
+    @property
+    def multi(self):
+        return len(self) > 1
+
+    @property
+    def done(self):
+        return not self.pending_files and not self.pending_dirs
+
+    def check(self, directory, entries=None, path_resolver=None):
+        """
+        Mark every pending target that is in directory as found and return them.
+        entries are the names already listed from directory, without them literal names are probed one by one
+        and patterns list the directory.
+        path_resolver is only called when something is found.
+        """
+        directory = normpath(directory)
+        hits = {}
+
+        if directory in self.pending_dirs:
+            hits[directory] = None
+
+        if self.pending_files:
+            if entries is None and self.matcher.literal_only:
+                hits.update((t, t) for t in self.pending_files if isfile(join(directory, t)))
+            else:
+                if entries is None:
+                    entries = FileProcessing.list_directory(directory)
+                hits.update(self.matcher.scan(entries, self.pending_files))
+
+        if hits:
+            path = path_resolver() if path_resolver else None
+            elapsed = time.perf_counter() - self.start_time
+            for target, name in hits.items():
+                self.pending_files.discard(target)
+                self.pending_dirs.discard(target)
+                self.found[target] = {"directory": directory, "file": name, "path": path, "time": elapsed}
+
+        return list(hits)
+
+    def report(self):
+        """Path and time-to-find of every target, None for the ones still missing."""
+        return {target: self.found.get(target) for target in self.target_files + self.target_dirs}
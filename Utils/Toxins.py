@@ -0,0 +1,43 @@
+from array import array
+from os.path import normpath, dirname
+
+# Effects a directory can carry, one bit each
+BYPASSED = 1  # Myotoxin, loss of control: the files of the directory are bypassed
+LOCKED = 2  # Neurotoxin, loss of nerve function: the files of the directory are locked
+HEMOTOXIN = 4  # The venom went through the directory when it was expanded
+
+
+class ToxinEffects:
+    """
+    Toxin effects of a venom search, recorded per directory instead of per file.
+    Directories are interned to ids, effects[id] is the bitmap of their effects and files[id] their file count from
+    the snapshot. A file carries the effects of its directory and the totals are sums over the directories, so the
+    effects cost no listing and no memory per file.
+    """
+    def __init__(self):
+        self.ids = {}  # directory -> id
+        self.effects = array("B")
+        self.files = array("q")
+
+    def __len__(self):
+        return len(self.effects)
+
+    def mark(self, directory, effect, file_count):
+        directory = normpath(directory)
+        i = self.ids.get(directory)
+        if i is None:
+            i = self.ids[directory] = len(self.effects)
+            self.effects.append(0)
+            self.files.append(file_count)
+        self.effects[i] |= effect
+
+    def has(self, directory, effect):
+        i = self.ids.get(normpath(directory))
+        return i is not None and bool(self.effects[i] & effect)
+
+    def file_has(self, file_path, effect):
+        return self.has(dirname(normpath(file_path)), effect)
+
+    def count(self, effect):
+        """Files whose directory carries the effect."""
+        return sum(files for effects, files in zip(self.effects, self.files) if effects & effect)
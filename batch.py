@@ -0,0 +1,170 @@
+from Algorithms import ALGORITHMS, ALIASES, build_algorithm
+from Utils.DirectoryIndex import DirectoryIndex
+from Utils.FileProcessing import FileProcessing
+from Utils.Metrics import collect_results, append_results
+import gc
+import os
+import io
+import csv
+import json
+import time
+import argparse
+import contextlib
+import multiprocessing
+
+
+parser = argparse.ArgumentParser(description="Snake Venom Algorithm, batch of queries over a shared directory index")
+
+parser.add_argument("-q", "--queries",
+                    help="A CSV or JSONL file of queries with the columns start, target_dir and target_file",
+                    required=True)
+
+parser.add_argument("-alg", "--algorithm",
+                    help="The algorithm that answers every query",
+                    choices=[*ALIASES, *ALGORITHMS],
+                    default="MkII")
+
+parser.add_argument("-ix", "--index",
+                    help="The directory index file. It is loaded when it exists, otherwise it is built and saved there",
+                    default="directory_index.pickle")
+
+parser.add_argument("-ir", "--indexroot",
+                    help="The directory the index is built from. The default value is the common directory of every query")
+
+parser.add_argument("-rt", "--runtime",
+                    help="A run time in minutes for each query",
+                    type=float,
+                    default=0)
+
+parser.add_argument("-w", "--workers",
+                    help="Number of worker processes answering the queries",
+                    type=int,
+                    default=os.cpu_count())
+
+parser.add_argument("-o", "--output",
+                    help="A CSV or JSONL file the per query results are written to",
+                    default="batch_results.jsonl")
+
+parser.add_argument("-v", "--verbose",
+                    help="Keep the output of the algorithms",
+                    action="store_true")
+
+
+def load_queries(path):
+    """Queries from a CSV file with a header or from a JSONL file, one query per line."""
+    with open(path, newline="") as file:
+        if path.endswith(".jsonl") or path.endswith(".json"):
+            queries = [json.loads(line) for line in file if line.strip()]
+        else:
+            queries = list(csv.DictReader(file))
+
+    for query in queries:
+        for key in ("start", "target_dir", "target_file"):
+            if not query.get(key):
+                raise ValueError(f"Query {query} is missing {key}")
+    return queries
+
+
+def write_results(path, results):
+    with open(path, "w", newline="") as file:
+        if path.endswith(".csv"):
+            writer = csv.DictWriter(file, fieldnames=list(results[0]))
+            writer.writeheader()
+            # The per target report is nested, it is kept as JSON in its cell
+            writer.writerows({**result, "targets": json.dumps(result["targets"])} for result in results)
+        else:
+            for result in results:
+                file.write(json.dumps(result) + "\n")
+
+
+_settings = {}
+
+
+def _init_worker(index_path, algo_name, run_time, verbose):
+    """
+    Every worker answers many queries with the shared index. Forked workers share the one the parent installed,
+    spawned ones have to load their own copy.
+    """
+    if FileProcessing.installed_index() is None:
+        FileProcessing.install_index(DirectoryIndex.load(index_path))
+    _settings.update(algo_name=algo_name, run_time=run_time, verbose=verbose)
+
+
+def answer_query(numbered_query):
+    """The result row of a query and the results text its algorithm produced, written by the parent."""
+    number, query = numbered_query
+    output = None if _settings["verbose"] else io.StringIO()
+    written = []
+    collect_results(written)
+
+    algo = None
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(output) if output else contextlib.nullcontext():
+        try:
+            algo, method = build_algorithm(_settings["algo_name"], query["start"], query["target_dir"],
+                                           query["target_file"], run_time_min=_settings["run_time"])
+            method()
+            error = None
+        except Exception as e:
+            error = f"{type(e).__name__}: {e}"
+    latency = time.perf_counter() - start
+    collect_results(None)
+
+    row = {
+        "query": number,
+        "start": query["start"],
+        "target_dir": query["target_dir"],
+        "target_file": query["target_file"],
+        "algorithm": _settings["algo_name"],
+        "latency": latency,
+        "found": algo.targets.done if algo else False,
+        "infected_nodes": algo.infected_nodes if algo else 0,
+        "infected_files": algo.infected_files if algo else 0,
+        "targets": algo.targets.report() if algo else {},
+        "error": error
+    }
+    return row, written
+
+
+if __name__ == "__main__":
+    arguments = parser.parse_args()
+
+    ALGO = ALIASES.get(arguments.algorithm, arguments.algorithm)
+    queries = load_queries(arguments.queries)
+    print(f"Loaded {len(queries)} queries from {arguments.queries}")
+    print(f"Algorithm: {ALGO}")
+
+    index_root = arguments.indexroot
+    if index_root is None:
+        index_root = os.path.commonpath([os.path.abspath(query[key])
+                                         for query in queries for key in ("start", "target_dir")])
+    index = DirectoryIndex.build_or_load(arguments.index, index_root)
+
+    # Forked workers share the index of the parent copy-on-write instead of unpickling one each,
+    # freezing it keeps the collector from touching, and so copying, its pages
+    if "fork" in multiprocessing.get_all_start_methods():
+        FileProcessing.install_index(index)
+        gc.freeze()
+        context = multiprocessing.get_context("fork")
+    else:
+        del index
+        context = multiprocessing.get_context()
+
+    started = time.perf_counter()
+    with context.Pool(arguments.workers, initializer=_init_worker,
+                      initargs=(arguments.index, ALGO, arguments.runtime, arguments.verbose)) as pool:
+        answers = pool.map(answer_query, enumerate(queries))
+    elapsed = time.perf_counter() - started
+
+    # One writer, in query order, for the results files of the algorithms
+    results = []
+    for row, written in answers:
+        results.append(row)
+        for algo_name, text in written:
+            append_results(algo_name, text)
+    write_results(arguments.output, results)
+
+    found = sum(1 for result in results if result["found"])
+    print(f"Answered {len(results)} queries in {elapsed} seconds, {found} found")
+    print(f"Mean latency: {sum(result['latency'] for result in results) / len(results)} seconds")
+    print(f"Results written to {arguments.output}")
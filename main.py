@@ -1,10 +1,14 @@
 
-from Algorithms import First_Version_Venom, Second_Version_Venom, Latest_Version_Venom, Learning_Snake_Venom
-from Algorithms import BFO, AStar, EBS_AStar, Dijkstra
-from Utils.Metrics import time_algorithm
+from Algorithms import ALGORITHMS, ALIASES, build_algorithm
+from Utils.Metrics import time_algorithm, set_cache_mode, targets_in_file
+from Utils.CacheControl import CACHE_MODES, cache_root, prepare_cache
+from Utils.PruneRules import PruneRules, PSEUDO_FILESYSTEMS
+from Utils.Checkpoint import attach_checkpoint
 import os
 import time
 import argparse
+import multiprocessing
+from queue import Empty
 
 
 parser = argparse.ArgumentParser(description="Snake Venom Algorithm")
@@ -18,9 +22,15 @@ parser.add_argument("-tp", "--targetpath",
                     required=True)
 
 parser.add_argument("-tf", "--targetfile",
-                    help="A target file that must contain a valid filename along and its extension",
+                    help="One or more target files that must contain a valid filename along and its extension, a glob like *.kdbx or a regex prefixed with re:. All of them are searched in a single traversal",
+                    nargs="+",
                     required=True)
 
+parser.add_argument("-td", "--targetdirs",
+                    help="Optional absolute target directories that are searched for in the same traversal as the target files",
+                    nargs="*",
+                    default=[])
+
 parser.add_argument("-rt", "--runtime",
                     help="A run time in seconds for each algorithm to run",
                     type=float,
@@ -28,49 +38,189 @@ parser.add_argument("-rt", "--runtime",
 
 parser.add_argument("-alg", "--algorithm",
                     help="An algorithm to run. The default value is all algorithms",
-                    choices=["none","all", "SVT", "SVT_A", "SVT_B", "SVT_C", "A_Star", "Dijkstra", "BFO", "EBS"],
+                    choices=["none", "all", *ALIASES, *ALGORITHMS],
                     nargs="*",
                     metavar="algorithm",
                     default="all")
 
+parser.add_argument("-cm", "--cachemode",
+                    help="Cache state every algorithm starts from. Every mode except shared runs each algorithm in a fresh process, "
+                         "warm answers its listings from a directory index walked beforehand",
+                    choices=CACHE_MODES,
+                    default="shared")
+
+parser.add_argument("-hr", "--heuristic",
+                    help="Heuristic of A_Star. tree is the exact tree distance to the target path",
+                    choices=["file_count", "tree"],
+                    default="file_count")
+
+parser.add_argument("-gw", "--guideweight",
+                    help="Weight of the tree distance to the target path added to the cost of the venom algorithms. 0 disables it",
+                    type=float,
+                    default=0)
+
+parser.add_argument("-nfs", "--nofollowsymlinks",
+                    help="Do not follow symlinked directories. Directories reached under a second name are skipped either way",
+                    action="store_true")
+
+parser.add_argument("-pp", "--pruneprefix",
+                    help="Absolute directories never explored, with their whole subtree",
+                    nargs="*",
+                    default=[])
+
+parser.add_argument("-pg", "--pruneglob",
+                    help="Globs of directories never explored. Without a separator the glob matches the directory name, like node_modules",
+                    nargs="*",
+                    default=[])
+
+parser.add_argument("-pfs", "--prunefstypes",
+                    help="Filesystem types whose mount points are never explored. The default is the pseudo filesystems like proc and sysfs, pass none to explore them",
+                    nargs="*",
+                    default=sorted(PSEUDO_FILESYSTEMS))
+
+parser.add_argument("-ofs", "--onefilesystem",
+                    help="Do not explore directories on another filesystem than the start path",
+                    action="store_true")
+
+parser.add_argument("-md", "--maxdepth",
+                    help="Do not explore directories more than this many levels below the level of the start path, "
+                         "in its subtree and in the branches reached by climbing above it",
+                    type=int,
+                    default=None)
+
+parser.add_argument("-nb", "--nodebudget",
+                    help="Most frontier entries the heap based algorithms keep in memory, the worst ones are evicted and regenerated from their parent when needed",
+                    type=int,
+                    default=None)
+
+parser.add_argument("-sl", "--spilllimit",
+                    help="Frontier entries the heap based algorithms keep in memory before spilling sorted runs to disk",
+                    type=int,
+                    default=None)
+
+parser.add_argument("-ve", "--visitederror",
+                    help="False positive rate of Bloom filters used instead of the visited directory and infected file sets. By default the sets are exact",
+                    type=float,
+                    default=None)
+
+parser.add_argument("-bp", "--bacteria",
+                    help="Population size of BFO, the default is 10",
+                    type=int,
+                    default=None)
+
+parser.add_argument("-ck", "--checkpoint",
+                    help="Seconds between two checkpoints of the search into <algorithm>.checkpoint. 0 disables them",
+                    type=float,
+                    default=0)
+
+parser.add_argument("--resume",
+                    help="Continue every algorithm from its checkpoint, left by a run that was killed",
+                    action="store_true")
+
+parser.add_argument("-bd", "--bidirectional",
+                    help="VIPER and its Mk versions also climb back from the target path and stop where both searches meet",
+                    action="store_true")
+
+parser.add_argument("-smp", "--smoothpaths",
+                    help="EBS reports smoothed paths, keeping only the directories each one is not directly connected past",
+                    action="store_true")
+
+parser.add_argument("-af", "--auditfiles",
+                    help="EBS and BFO also keep the path of every infected file, instead of counting files per directory",
+                    action="store_true")
+
+
+def run_algorithm(algo_name, starting_path, target_path, target_file, target_dirs, file_limit, run_time, cache_mode,
+                  options):
+    """Prepare the cache, build the algorithm and time it.
+    The report of every target is appended to the timed result."""
+    set_cache_mode(cache_mode)
+    prepare_cache(cache_mode, cache_root(starting_path, target_path), options.get("prune_rules"))
+
+    # Built here so the start time of the algorithm is not shared with the previous ones
+    algo, method = build_algorithm(algo_name, starting_path, target_path, target_file,
+                                   file_limit=file_limit, run_time_min=run_time, target_dirs=target_dirs, **options)
+    if options.get("checkpoint") or options.get("resume"):
+        attach_checkpoint(algo, options.get("checkpoint"), options.get("resume"))
+    timed_result = time_algorithm(method, mode=cache_mode)
+
+    report = algo.targets.report()
+    # Next to the results of the same run
+    targets_in_file(report, algo.result_name)
+    timed_result.append(report)
+    return timed_result
+
+
+def _run_algorithm_in_child(queue, *args):
+    queue.put(run_algorithm(*args))
+
+
+def run_algorithm_in_fresh_process(*args, poll=1.0):
+    """
+    Run an algorithm in a spawned process so no process-level cache survives from the previous one.
+    None when the child died without a result.
+    """
+    context = multiprocessing.get_context("spawn")
+    queue = context.Queue()
+    process = context.Process(target=_run_algorithm_in_child, args=(queue, *args))
+    process.start()
+    while True:
+        try:
+            timed_result = queue.get(timeout=poll)
+            break
+        except Empty:
+            if process.is_alive():
+                continue
+            # The result may have been put right before the child exited
+            try:
+                timed_result = queue.get(timeout=poll)
+                break
+            except Empty:
+                print(f"{args[0]} exited with code {process.exitcode} without a result")
+                timed_result = None
+                break
+    process.join()
+    return timed_result
+
 
 if __name__ == "__main__":
     # Parse arguments
     arguments = parser.parse_args()
+    if arguments.visitederror and arguments.nodebudget:
+        parser.error("the node budget reopens expanded directories, it needs exact visited sets and cannot be used with -ve")
     
     # Initialize constants with argument values or defaults
     STARTING_PATH = arguments.startpath
     TARGET_PATH = arguments.targetpath
-    TARGET_FILE = arguments.targetfile
+    # A single target keeps the original single file behaviour
+    TARGET_FILE = arguments.targetfile[0] if len(arguments.targetfile) == 1 else arguments.targetfile
+    TARGET_DIRS = arguments.targetdirs
     RUN_TIME = arguments.runtime
     ALGOS = arguments.algorithm if isinstance(arguments.algorithm, list) else [arguments.algorithm]
+    CACHE_MODE = arguments.cachemode
+    OPTIONS = {"heuristic": arguments.heuristic, "guide_weight": arguments.guideweight,
+               "follow_symlinks": not arguments.nofollowsymlinks, "node_budget": arguments.nodebudget,
+               "spill_limit": arguments.spilllimit, "visited_error_rate": arguments.visitederror,
+               "population": arguments.bacteria, "bidirectional": arguments.bidirectional,
+               "smooth_paths": arguments.smoothpaths, "audit_files": arguments.auditfiles,
+               # Compiled once and shared by every algorithm
+               "prune_rules": PruneRules(STARTING_PATH, arguments.pruneprefix, arguments.pruneglob,
+                                         [t for t in arguments.prunefstypes if t != "none"],
+                                         arguments.onefilesystem, arguments.maxdepth),
+               "checkpoint": arguments.checkpoint, "resume": arguments.resume}
     
     print(f"Starting path: {STARTING_PATH}")
     print(f"Target path: {TARGET_PATH}")
     print(f"Target file: {TARGET_FILE}")
+    if TARGET_DIRS:
+        print(f"Target directories: {TARGET_DIRS}")
     if RUN_TIME != 0:
         print(f"Run time: {RUN_TIME} {'minutes' if RUN_TIME > 1 else 'minute'}")
     print(f"Algorithms to run: {ALGOS}")
+    print(f"Cache mode: {CACHE_MODE}")
 
     file_Limits = [190_000, 200_000, 390_000, 400_000, 590_000, 600_000]
 
-    # Initialize all algorithms
-    algorithms = {
-        "VIPER": First_Version_Venom.VIPER(STARTING_PATH, TARGET_PATH, TARGET_FILE, file_limit=file_Limits),
-        "MkI": Second_Version_Venom.VIPER_Mk_I(STARTING_PATH, TARGET_PATH, TARGET_FILE, file_limit=file_Limits),
-        "MkII": Latest_Version_Venom.VIPER_Mk_II(STARTING_PATH, TARGET_PATH, TARGET_FILE, file_limit=file_Limits),
-        "MkIII": Learning_Snake_Venom.VIPER_Mk_III(STARTING_PATH, TARGET_PATH, TARGET_FILE, file_limit=file_Limits),
-        "A_Star": AStar.AStar(STARTING_PATH, TARGET_PATH, TARGET_FILE, file_limit=file_Limits),
-        "EBS": EBS_AStar.EBSAStar(STARTING_PATH, TARGET_PATH, TARGET_FILE, file_limit=file_Limits),
-        "Dijkstra": Dijkstra.Dijkstra(STARTING_PATH, TARGET_PATH, TARGET_FILE, file_limit=file_Limits),
-        "BFO": BFO.BacterialForaging(STARTING_PATH, TARGET_PATH, TARGET_FILE, file_limit=file_Limits)
-    }
-
-    # Set runtime if specified
-    if RUN_TIME != 0:
-        for algo in algorithms.values():
-            algo.run_time_min = RUN_TIME
-
     # Prepare results storage
     results = {}
     infected_nodes = []
@@ -79,34 +229,22 @@ if __name__ == "__main__":
 
     # Run selected algorithms
     if "all" in ALGOS:
-        algorithms_to_run = algorithms.keys()
+        algorithms_to_run = list(ALGORITHMS)
     else:
-        algorithms_to_run = [alg for alg in ALGOS if alg in algorithms]
+        algorithms_to_run = [ALIASES.get(alg, alg) for alg in ALGOS if ALIASES.get(alg, alg) in ALGORITHMS]
 
     for algo_name in algorithms_to_run:
         print(f"\nStarting {algo_name}...")
-        algo = algorithms[algo_name]
-        
-        # Determine which method to call based on algorithm
-        if algo_name == "VIPER":
-            method = algo.viper
-        elif algo_name == "MkI":
-            method = algo.mk_i
-        elif algo_name == "MkII":
-            method = algo.mk_ii
-        elif algo_name == "MkIII":
-            method = algo.mk_iii
-        elif algo_name == "A_Star":
-            method = algo.a_star
-        elif algo_name == "EBS":
-            method = algo.ebs_astar
-        elif algo_name == "Dijkstra":
-            method = algo.dijkstra
-        elif algo_name == "BFO":
-            method = algo.run
-        
+        run_args = (algo_name, STARTING_PATH, TARGET_PATH, TARGET_FILE, TARGET_DIRS, file_Limits, RUN_TIME, CACHE_MODE, OPTIONS)
+
         # Time the algorithm
-        timed_result = time_algorithm(method)
+        if CACHE_MODE == "shared":
+            timed_result = run_algorithm(*run_args)
+        else:
+            timed_result = run_algorithm_in_fresh_process(*run_args)
+            if timed_result is None:
+                print(f"Skipping {algo_name}, its process failed")
+                continue
         results[algo_name] = timed_result
         
         # Store results
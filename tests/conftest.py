@@ -0,0 +1,54 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from Utils.FileProcessing import FileProcessing
+from Utils.PruneRules import PruneRules
+
+
+def make_tree(root):
+    """
+    root/a/b/goal/secret.kdbx is the target, root/c/other.kdbx a second one off the path,
+    the other directories only hold filler files.
+    """
+    layout = {
+        "a": ["a1.txt"],
+        "a/b": ["b1.txt", "b2.txt"],
+        "a/b/goal": ["secret.kdbx", "notes.txt"],
+        "a/d": ["d1.txt"],
+        "c": ["other.kdbx", "c1.txt"],
+        "c/e": ["e1.txt"],
+        "f": [],
+    }
+    for directory, files in layout.items():
+        os.makedirs(root / directory, exist_ok=True)
+        for name in files:
+            (root / directory / name).write_text(name)
+    return root
+
+
+@pytest.fixture
+def tree(tmp_path):
+    return make_tree(tmp_path / "root")
+
+
+@pytest.fixture
+def confined(tree, tmp_path):
+    """
+    PruneRules of the tree that never explore the working directory. The searches climb above the tree,
+    the results and checkpoint files written there would change the file counts between two runs.
+    """
+    return PruneRules(str(tree), prefixes=[str(tmp_path / "results")])
+
+
+@pytest.fixture(autouse=True)
+def isolated(tmp_path, monkeypatch):
+    """Results files are written into the working directory and file counts are shared by the process."""
+    (tmp_path / "results").mkdir()
+    monkeypatch.chdir(tmp_path / "results")
+    FileProcessing.clear_counts()
+    yield
+    FileProcessing.clear_counts()
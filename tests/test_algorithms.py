@@ -0,0 +1,30 @@
+import io
+import contextlib
+
+import pytest
+
+from Algorithms import ALGORITHMS, build_algorithm
+
+
+def run(name, start, goal, target, **options):
+    algo, method = build_algorithm(name, start, goal, target, file_limit=[1], **options)
+    with contextlib.redirect_stdout(io.StringIO()):
+        return algo, method()
+
+
+@pytest.mark.parametrize("name", list(ALGORITHMS))
+def test_finds_the_target(tree, name):
+    goal = str(tree / "a" / "b" / "goal")
+    algo, result = run(name, str(tree), goal, "secret.kdbx", run_time_min=0.2)
+    path, found = result[0], result[1]
+    assert found
+    assert goal in path
+    assert len(result) == 5
+
+
+@pytest.mark.parametrize("name", list(ALGORITHMS))
+def test_reports_a_missing_target(tree, name):
+    algo, result = run(name, str(tree), str(tree / "a" / "b" / "goal"), "missing.kdbx", run_time_min=0.01)
+    # A* reports a single target search as found once it reaches the target path
+    assert not result[1] or name == "A_Star"
+    assert algo.targets.report() == {"missing.kdbx": None}
@@ -0,0 +1,48 @@
+import copy
+import pickle
+
+import pytest
+
+from Utils.BloomFilter import BloomFilter, visited_set
+
+
+def test_added_paths_are_members():
+    bloom = BloomFilter(0.01, initial_capacity=100)
+    paths = [f"/dir/{i}" for i in range(1000)]
+    for path in paths:
+        bloom.add(path)
+    assert all(path in bloom for path in paths)
+    assert len(bloom) <= 1000
+    # Grew past its first layer and kept the error rate
+    assert len(bloom.layers) > 1
+    assert bloom.estimated_error() < 0.01
+
+
+def test_false_positive_rate_stays_under_the_error_rate():
+    bloom = BloomFilter(0.01, initial_capacity=1000)
+    for i in range(1000):
+        bloom.add(f"/in/{i}")
+    false_positives = sum(f"/out/{i}" in bloom for i in range(10_000))
+    assert false_positives / 10_000 < 0.02
+
+
+def test_cannot_forget_and_rejects_bad_rates():
+    with pytest.raises(TypeError):
+        BloomFilter().discard("/a")
+    with pytest.raises(ValueError):
+        BloomFilter(1.5)
+
+
+def test_journal_is_not_copied():
+    bloom = BloomFilter(0.01, initial_capacity=10)
+    bloom.journal = []
+    bloom.add("/a")
+    assert bloom.journal == ["/a"]
+    assert copy.deepcopy(bloom).journal is None
+    restored = pickle.loads(pickle.dumps(bloom))
+    assert restored.journal is None and "/a" in restored
+
+
+def test_visited_set():
+    assert visited_set() == set()
+    assert isinstance(visited_set(0.01), BloomFilter)
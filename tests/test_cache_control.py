@@ -0,0 +1,19 @@
+import io
+import contextlib
+
+from Utils.CacheControl import prepare_cache
+from Utils.FileProcessing import FileProcessing
+from Utils.PruneRules import PruneRules
+
+
+def test_warm_mode_installs_an_index_without_the_pruned_directories(tree):
+    rules = PruneRules(str(tree), globs=["c"])
+    try:
+        with contextlib.redirect_stdout(io.StringIO()):
+            prepare_cache("warm", str(tree), rules)
+        index = FileProcessing.installed_index()
+        assert str(tree / "a" / "b" / "goal") in index
+        assert str(tree / "c") not in index and str(tree / "c" / "e") not in index
+        assert FileProcessing.count_files_in_directory(str(tree / "a" / "b")) == 2
+    finally:
+        FileProcessing.install_index(None)
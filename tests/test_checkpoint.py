@@ -0,0 +1,91 @@
+import io
+import contextlib
+from array import array
+
+from Algorithms import build_algorithm
+from Utils.BloomFilter import BloomFilter
+from Utils.Checkpoint import JournalDict, JournalSet, JournalArray, Checkpoint, attach_checkpoint, _apply
+
+
+def test_journal_dict_records_only_the_changed_keys():
+    journal = JournalDict(a=1, b=2)
+    assert journal.delta() is None
+    journal["c"] = 3
+    journal.pop("a")
+    journal.pop("missing", None)
+    journal.setdefault("b", 5)
+    assert journal.delta() == ("dict", {"c": 3}, {"a"})
+    assert journal.delta() is None
+
+
+def test_journal_set_and_array():
+    journal = JournalSet({1})
+    journal.add(2)
+    journal.discard(1)
+    journal |= {3}
+    assert journal.delta() == ("set", {2, 3}, {1})
+
+    effects = JournalArray("B", [0, 0])
+    effects.append(4)
+    effects[0] |= 1
+    assert effects.delta() == ("array", "B", {0: 1}, 2, array("B", [4]))
+    assert effects.delta() is None
+
+
+def test_replay_rebuilds_the_state():
+    state = {}
+    journal = JournalDict({"a": 1})
+    _apply(state, "d", journal.full())
+    journal["b"] = 2
+    del journal["a"]
+    _apply(state, "d", journal.delta())
+    assert state["d"] == {"b": 2}
+
+    bloom = BloomFilter(0.01, initial_capacity=10)
+    _apply(state, "bloom", ("bloom", bloom, []))
+    _apply(state, "bloom", ("bloom", None, ["/x"]))
+    assert "/x" in state["bloom"]
+
+
+def steps_then_kill(algo, pops):
+    """Run the search for a few pops, like a run killed in the middle."""
+    algo.progress.set_interval(0)
+    search = algo.steps()
+    with contextlib.redirect_stdout(io.StringIO()):
+        for _ in zip(range(pops), search):
+            pass
+    algo.checkpoint.close()
+
+
+def test_resumed_search_matches_a_full_run(tree, confined):
+    goal = str(tree / "a" / "b" / "goal")
+
+    def make():
+        return build_algorithm("Dijkstra", str(tree), goal, "secret.kdbx", prune_rules=confined)
+
+    algo, method = make()
+    with contextlib.redirect_stdout(io.StringIO()):
+        full = method()
+
+    algo, _ = make()
+    checkpoint = attach_checkpoint(algo, 1e-9)
+    checkpoint.compact_every = 2
+    steps_then_kill(algo, 3)
+    assert checkpoint.records >= 1
+
+    algo, method = make()
+    with contextlib.redirect_stdout(io.StringIO()):
+        assert attach_checkpoint(algo, 1e-9, resume=True).records >= 1
+        resumed = method()
+    assert resumed[0] == full[0]
+    assert resumed[1] and resumed[3:] == full[3:]
+
+
+def test_torn_record_is_ignored(tmp_path):
+    path = str(tmp_path / "torn.checkpoint")
+    checkpoint = Checkpoint(path)
+    checkpoint.write({"elapsed": 1.0, "random": None, "delta": {"costs": ("dict", {"/a": 1}, None)}})
+    with open(path, "ab") as f:
+        f.write(b"\x00\x00\x00\x10garbage")
+    state, elapsed, _ = Checkpoint(path).read()
+    assert state == {"costs": {"/a": 1}} and elapsed == 1.0
@@ -0,0 +1,48 @@
+import os
+
+import pytest
+
+from Utils.FileProcessing import FileProcessing, NeighborRecord
+from Utils.NodeIdentity import NodeRegistry
+
+
+def test_neighbor_record_counts_on_first_read(tree):
+    records = FileProcessing(NodeRegistry()).get_all_directories_with_file_counts(str(tree / "a" / "b"))
+    assert [record["dir_name"] for record in records] == [str(tree / "a" / "b" / "goal")]
+    record = records[0]
+    assert "value" not in record
+    assert record["value"] == 2
+    assert record["status"] == "vulnerable"
+    with pytest.raises(KeyError):
+        record["missing"]
+
+
+def test_neighbor_record_of_a_vanished_directory(tree):
+    record = NeighborRecord(dir_name=str(tree / "gone"), status="vulnerable")
+    with pytest.raises(FileNotFoundError):
+        record["value"]
+
+
+def test_forget_count_reads_a_changed_directory_again(tree):
+    directory = str(tree / "f")
+    assert FileProcessing.count_files_in_directory(directory) == 0
+    (tree / "f" / "new.txt").write_text("x")
+    assert FileProcessing.count_files_in_directory(directory) == 0
+    FileProcessing.forget_count(directory)
+    assert FileProcessing.count_files_in_directory(directory) == 1
+
+
+def test_keys_leave_the_registry_untouched(tree):
+    identity = NodeRegistry()
+    keys = {}
+    subdirectories = FileProcessing.list_subdirectories(str(tree), identity, None, None, keys)
+    assert sorted(keys) == sorted(subdirectories)
+    assert identity.owners == {} and identity.keys == {}
+    assert all(identity.register(path, key=key) for path, key in keys.items())
+
+
+def test_symlinked_duplicates_are_left_out(tree):
+    os.symlink(tree / "a", tree / "link")
+    identity = NodeRegistry()
+    subdirectories = FileProcessing.list_subdirectories(str(tree), identity)
+    assert len([d for d in subdirectories if os.path.basename(d) in ("a", "link")]) == 1
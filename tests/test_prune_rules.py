@@ -0,0 +1,28 @@
+import os
+
+from Utils.PruneRules import PruneRules
+
+
+def test_prefixes_globs_and_depth(tree):
+    root = str(tree)
+    rules = PruneRules(root, prefixes=[os.path.join(root, "c")], globs=["goal", os.path.join(root, "a", "d*")],
+                       fs_types=(), max_depth=2)
+    assert rules.allows(root)
+    assert not rules.allows(os.path.join(root, "c"))
+    assert not rules.allows(os.path.join(root, "a", "b", "goal"))
+    assert not rules.allows(os.path.join(root, "a", "d"))
+    assert rules.allows(os.path.join(root, "a", "b"))
+    assert not rules.allows(os.path.join(root, "a", "b", "x"))
+
+
+def test_rules_that_prune_the_root_are_dropped(tree):
+    root = str(tree)
+    rules = PruneRules(os.path.join(root, "a"), prefixes=[root], fs_types=())
+    assert rules.prefixes == frozenset()
+
+
+def test_max_depth_is_a_level_also_in_the_branches_above_the_start(tree):
+    rules = PruneRules(os.path.join(str(tree), "a"), fs_types=(), max_depth=1)
+    # One level above the start, the sibling branch may go two levels down
+    assert rules.allows(os.path.join(str(tree), "c", "e"))
+    assert not rules.allows(os.path.join(str(tree), "c", "e", "x"))
@@ -0,0 +1,104 @@
+import io
+import contextlib
+
+import pytest
+
+from Algorithms import build_algorithm
+from Utils.FileProcessing import FileProcessing, NeighborRecord
+from Utils.SearchEngine import Frontier, SearchPolicy, relax, make_frontier
+from Utils.SpillFrontier import SpillFrontier
+
+
+def quiet(method):
+    with contextlib.redirect_stdout(io.StringIO()):
+        return method()
+
+
+def test_keyed_frontier_replaces_a_priority():
+    frontier = Frontier(keyed=True)
+    frontier.push("a", 5)
+    frontier.push("b", 3)
+    frontier.push("a", 1)
+    assert len(frontier) == 2 and "a" in frontier
+    assert frontier.pop() == (1, "a")
+    assert frontier.pop() == (3, "b")
+    with pytest.raises(IndexError):
+        frontier.pop()
+
+
+def test_unkeyed_frontier_pops_every_push_in_insertion_order():
+    frontier = Frontier(keyed=False)
+    frontier.push("a", 2)
+    frontier.push("b", 2)
+    frontier.push("a", 1)
+    assert [frontier.pop() for _ in range(3)] == [(1, "a"), (2, "a"), (2, "b")]
+
+
+def test_evict_keeps_the_kept_nodes_and_the_better_priorities():
+    frontier = Frontier(keyed=True)
+    for i, node in enumerate("abcde"):
+        frontier.push(node, i)
+    evicted = frontier.evict(3, keep={"e"}, above=1)
+    assert sorted(evicted) == [("c", 2), ("d", 3)]
+    assert [frontier.pop() for _ in range(3)] == [(0, "a"), (1, "b"), (4, "e")]
+
+
+def test_make_frontier():
+    assert isinstance(make_frontier(), Frontier)
+    assert isinstance(make_frontier(10), SpillFrontier)
+
+
+class Policy(SearchPolicy):
+    def __init__(self, skipped=()):
+        self.frontier = Frontier(keyed=True)
+        self.costs = {"/r": 0}
+        self.parent_map = {"/r": "/r"}
+        self.skipped = set(skipped)
+
+    def skip(self, node, child):
+        return child in self.skipped
+
+    def cost(self, node, entry):
+        return self.costs[node] + entry["value"]
+
+
+def test_relax_pushes_improved_children_only():
+    policy = Policy()
+    relax(policy, "/r", {"dir_name": "/r/a", "value": 3})
+    relax(policy, "/r", {"dir_name": "/r/a/", "value": 5})
+    assert policy.costs["/r/a"] == 3
+    relax(policy, "/r", {"dir_name": "/r/a", "value": 1})
+    assert policy.costs["/r/a"] == 1 and policy.parent_map["/r/a"] == "/r"
+    assert policy.frontier.pop() == (1, "/r/a")
+
+
+def test_relax_does_not_count_skipped_or_unreadable_children(tmp_path):
+    policy = Policy(skipped={str(tmp_path / "skipped")})
+    # Counting a missing directory would raise, a skipped one is never counted
+    relax(policy, "/r", NeighborRecord(dir_name=str(tmp_path / "skipped"), status="vulnerable"))
+    relax(policy, "/r", NeighborRecord(dir_name=str(tmp_path / "missing"), status="vulnerable"))
+    assert len(policy.frontier) == 0
+
+
+def test_node_budget_counts_regenerated_directories_once(tree, confined):
+    goal = str(tree / "a" / "b" / "goal")
+    results = {}
+    for budget in (None, 1):
+        algo, method = build_algorithm("Dijkstra", str(tree), goal, "secret.kdbx", node_budget=budget,
+                                       prune_rules=confined)
+        results[budget] = quiet(method)
+        assert results[budget][1]
+    assert results[1][3:] == results[None][3:]
+
+
+def test_node_budget_is_rejected_with_bloom_filters(tree):
+    with pytest.raises(ValueError):
+        build_algorithm("Dijkstra", str(tree), str(tree / "a"), "secret.kdbx", node_budget=3, visited_error_rate=0.01)
+
+
+def test_files_are_charged_once_per_expanded_directory(tree):
+    algo, method = build_algorithm("Dijkstra", str(tree), str(tree / "a" / "b" / "goal"), "secret.kdbx")
+    result = quiet(method)
+    assert result[1]
+    assert result[3] == len(algo.visited)
+    assert result[4] == sum(FileProcessing.count_files_in_directory(node) for node in algo.visited)
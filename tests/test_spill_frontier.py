@@ -0,0 +1,35 @@
+import os
+import random
+
+from Utils.SpillFrontier import SpillFrontier
+
+
+def test_pops_in_priority_order_across_runs(capsys):
+    rng = random.Random(1)
+    frontier = SpillFrontier(memory_limit=8, fan_in=3)
+    expected = []
+    for i in range(300):
+        priority = float(rng.randint(0, 40))
+        frontier.push(f"n{i}", priority)
+        expected.append((priority, i, f"n{i}"))
+    expected.sort()
+
+    # Merged past the fan-in, the open runs stay bounded
+    assert len(frontier.heads) <= 3
+    assert len(os.listdir(frontier.directory.name)) == len(frontier.heads)
+    assert len(frontier) == 300
+
+    popped = [frontier.pop() for _ in range(300)]
+    assert popped == [(priority, node) for priority, _, node in expected]
+    assert len(frontier) == 0
+    assert os.listdir(frontier.directory.name) == []
+
+
+def test_membership_only_knows_memory():
+    frontier = SpillFrontier(memory_limit=2)
+    frontier.push("a", 1.0)
+    frontier.push("b", 2.0)
+    frontier.push("c", 3.0)
+    assert "a" in frontier
+    assert "c" not in frontier
+    assert frontier.pop() == (1.0, "a")
@@ -0,0 +1,35 @@
+from Utils.TargetMatcher import TargetMatcher, is_pattern
+
+
+def test_is_pattern():
+    assert not is_pattern("secret.kdbx")
+    assert is_pattern("*.kdbx")
+    assert is_pattern("re:^a$")
+
+
+def test_literal_extension_glob_and_regex():
+    matcher = TargetMatcher(["secret.kdbx", "*.pem", "id_rsa*", r"re:backup_\d+\.zip"])
+    assert matcher.match("secret.kdbx") == ["secret.kdbx"]
+    assert matcher.match("server.pem") == ["*.pem"]
+    assert matcher.match("id_rsa.pub") == ["id_rsa*"]
+    assert matcher.match("backup_12.zip") == [r"re:backup_\d+\.zip"]
+    assert matcher.match("backup_12.zip.old") == []
+    assert not matcher.literal_only
+
+
+def test_regex_keeps_its_own_groups_and_flags():
+    matcher = TargetMatcher([r"re:(?i)(ab)\1\.txt", "re:(x)y"])
+    assert matcher.match("ABab.txt") == [r"re:(?i)(ab)\1\.txt"]
+    assert matcher.match("xy") == ["re:(x)y"]
+
+
+def test_scan_returns_the_first_name_of_every_wanted_target():
+    matcher = TargetMatcher(["*.kdbx", "notes.txt"])
+    hits = matcher.scan(["a.kdbx", "b.kdbx", "notes.txt"], {"*.kdbx", "notes.txt"})
+    assert hits == {"*.kdbx": "a.kdbx", "notes.txt": "notes.txt"}
+
+
+def test_scan_literal_only():
+    matcher = TargetMatcher(["a", "b"])
+    assert matcher.literal_only
+    assert matcher.scan(["b", "c"], {"a", "b"}) == {"b": "b"}